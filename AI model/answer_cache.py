@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+
+# Konfiguracja pamięci odpowiedzi (można nadpisać zmiennymi środowiskowymi)
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 1024))  # Maksymalna liczba odpowiedzi (0 wyłącza pamięć)
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", 3600))  # Czas życia wpisu w sekundach (0 = bez limitu)
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", 0))  # Próg podobieństwa pytań (0 wyłącza dopasowanie przybliżone)
+
+
+def normalize_question(question):
+    # Małe litery, bez interpunkcji i nadmiarowych spacji
+    return " ".join(re.sub(r"[^\w\s']", " ", question.lower()).split())
+
+
+class AnswerCache:
+    """
+    Ograniczona pamięć odpowiedzi (LRU + TTL) z kluczem (typ przedmiotu, wariant, znormalizowane pytanie).
+    Wariant rozróżnia odpowiedzi tego samego pytania generowane w różny sposób (np. tryb generowania).
+    Opcjonalnie, gdy podano embed_fn i próg podobieństwa, pytanie bez dokładnego trafienia
+    porównywane jest (podobieństwo cosinusowe) z zapamiętanymi pytaniami o ten sam przedmiot.
+    Przy exact klucz nie jest normalizowany: trafienie wymaga identycznego tekstu obu części.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 similarity_threshold=ANSWER_CACHE_SIMILARITY, embed_fn=None, exact=False):
+        self.max_entries = max(0, int(max_entries))
+        self.exact = exact
+        self.ttl = float(ttl)
+        self.similarity_threshold = float(similarity_threshold)
+        self.embed_fn = embed_fn if self.similarity_threshold > 0 else None
+        self._entries = OrderedDict()  # ((przedmiot, wariant), pytanie) -> (czas wygaśnięcia, wartość)
+        self._embeddings = {}  # (przedmiot, wariant) -> {pytanie: wektor}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, item_type, question, variant=None):
+        """Zwraca zapamiętaną wartość lub None."""
+        if not self.enabled:
+            return None
+        key = self._key(item_type, question, variant)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        if self.embed_fn is not None:
+            similar_key = self._find_similar(key, question)
+            if similar_key is not None:
+                with self._lock:
+                    value = self._lookup(similar_key)
+                    if value is not None:
+                        self.near_hits += 1
+                        return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, item_type, question, value, variant=None):
+        if not self.enabled:
+            return
+        key = self._key(item_type, question, variant)
+        embedding = self.embed_fn(question) if self.embed_fn is not None else None
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if embedding is not None:
+                self._embeddings.setdefault(key[0], {})[key[1]] = embedding
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)  # Usunięcie najdawniej używanego wpisu
+                self._forget_embedding(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxSize": self.max_entries,
+                "hits": self.hits,
+                "nearHits": self.near_hits,
+                "misses": self.misses,
+                "hitRate": (self.hits + self.near_hits) / lookups if lookups else 0.0
+            }
+
+    def _key(self, item_type, question, variant):
+        if self.exact:
+            return (item_type, variant), question
+        return (item_type.lower(), variant), normalize_question(question)
+
+    def _lookup(self, key):
+        # Wywoływane pod blokadą
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]  # Wpis przeterminowany
+            self._forget_embedding(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _forget_embedding(self, key):
+        item_embeddings = self._embeddings.get(key[0])
+        if item_embeddings:
+            item_embeddings.pop(key[1], None)
+
+    def _find_similar(self, key, question):
+        with self._lock:
+            candidates = list(self._embeddings.get(key[0], {}).items())
+        if not candidates:
+            return None
+        query = self.embed_fn(question)
+        matrix = torch.stack([embedding for _, embedding in candidates])
+        scores = torch.nn.functional.cosine_similarity(matrix, query.unsqueeze(0), dim=-1)
+        best = int(torch.argmax(scores))
+        if float(scores[best]) >= self.similarity_threshold:
+            return (key[0], candidates[best][0])
+        return None
@@ -0,0 +1,1061 @@
+import contextvars
+import functools
+import os
+import threading
+import time  # Import modułu time do pomiaru czasu
+from concurrent.futures import Future
+
+import torch
+from transformers import AutoModelForQuestionAnswering, AutoModelForSeq2SeqLM, pipeline
+
+from answer_cache import AnswerCache
+from batching import MicroBatcher, generate_batch, stream_generate, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS, TOKENIZER_LOCK
+from decoding import DECODING, DECODING_PROFILES, ANSWER_MAX_NEW_TOKENS, SENTENCE_MAX_NEW_TOKENS, decoding_kwargs
+from encoder_cache import EncoderCache
+from logging_config import fields, get_logger
+from metrics import BATCH_SIZE, HYBRID_ANSWERS, MODEL_STEP_SECONDS, STAGE_SECONDS, module_bytes
+from process_pool import REPLICA_TASK_TIMEOUT, get_replica_pool, task_result
+from quantization import QUANTIZE, quantize_model
+from weights import load_model, load_tokenizer
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"  # Użycie GPU, jeśli dostępne
+MAX_CONTEXT_LENGTH = 512  # Maksymalna długość kontekstu w tokenach (FLAN-T5)
+GENERATION_MODES = ("fast", "quality", "hybrid")  # fast: jedno przejście modelu, quality: odpowiedź + dopracowanie, hybrid: fragment z modelu qa + dopracowanie
+DEFAULT_MODE = os.environ.get("GENERATION_MODE", "quality")  # Tryb używany, gdy klient go nie poda
+QA_CONTEXT_MODE = os.environ.get("QA_CONTEXT_MODE", "window")  # window: nakładające się okna, truncate: obcięcie do 450 tokenów
+QA_MAX_SEQ_LEN = int(os.environ.get("QA_MAX_SEQ_LEN", 384))  # Długość okna (pytanie + fragment kontekstu) w tokenach
+QA_DOC_STRIDE = int(os.environ.get("QA_DOC_STRIDE", 128))  # Nakładanie się sąsiednich okien w tokenach
+QA_WINDOW_BATCH_SIZE = int(os.environ.get("QA_WINDOW_BATCH_SIZE", 8))  # Liczba okien w jednym wywołaniu modelu
+ANSWER_INTRO = "According to the available information,"  # Wstęp wymuszany w prompcie, usuwany z odpowiedzi
+REFINE_MODEL = os.environ.get("REFINE_MODEL", "")  # Osobny (np. mniejszy) model etapu dopracowania; pusty = ten sam model
+HYBRID_QA_MODEL = os.environ.get("HYBRID_QA_MODEL", "deepset/roberta-base-squad2")  # Model wskazujący fragment opisu w trybie hybrid
+HYBRID_MIN_SCORE = float(os.environ.get("HYBRID_MIN_SCORE", 0.3))  # Niższa ocena fragmentu = generowanie z pełnym kontekstem
+
+
+logger = get_logger("backends")
+
+
+class BackendError(Exception):
+    """Błąd zapytania zwracany klientowi z podanym kodem HTTP."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Backend:
+    """
+    Wspólny interfejs modeli obsługujących /generate. Model jest ładowany leniwie
+    przy pierwszym użyciu (lub od razu, przez load()), a opisy przedmiotów pochodzą
+    ze wspólnego ItemStore.
+    """
+
+    MODEL_CLASS = AutoModelForSeq2SeqLM  # Klasa modelu (ładowanie i konwersja wag do safetensors)
+
+    def __init__(self, name, model_name, item_store, quantize=None):
+        self.name = name
+        self.model_name = model_name
+        self.item_store = item_store
+        self.quantize = quantize or QUANTIZE  # Żądany tryb kwantyzacji
+        self.quantization = None  # Tryb faktycznie użyty po załadowaniu
+        self.model_bytes = None  # Rozmiar wag po załadowaniu
+        self.answer_cache = None
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """Ładuje model (tylko raz, bezpiecznie wątkowo)."""
+        if self._loaded:
+            return self
+        with self._load_lock:
+            if not self._loaded:
+                logger.info("Loading backend", extra=fields(backend=self.name, model=self.model_name, quantize=self.quantize, device=DEVICE))
+                start_time = time.time()
+                try:
+                    self._load()
+                    self.model_bytes = module_bytes(self.model) if self.model is not None else None  # Przy puli replik wagi są tylko w replikach
+                except Exception:
+                    logger.exception("Model loading error", extra=fields(backend=self.name))  # Logowanie błędu podczas ładowania modelu
+                    raise
+                self._loaded = True
+                logger.info("Backend loaded", extra=fields(backend=self.name, seconds=round(time.time() - start_time, 3), modelBytes=self.model_bytes))
+        return self
+
+    def answer(self, item_type, question, options):
+        """Zwraca słownik odpowiedzi dla /generate (options: pozostałe pola zapytania)."""
+        self.load()
+        item_type = self.item_store.resolve(item_type) or item_type  # Nazwa alternatywna -> identyfikator z katalogu
+        return self._answer(item_type, question, self.get_context(item_type, question), options)
+
+    def stream(self, item_type, question, options):
+        """
+        Jak answer(), ale zwraca iterator zdarzeń (nazwa, dane): kolejne fragmenty odpowiedzi
+        ("token") i na końcu pełny wynik ("done"). Błędy zapytania zgłaszane są od razu.
+        """
+        self.load()
+        item_type = self.item_store.resolve(item_type) or item_type
+        return self._stream(item_type, question, self.get_context(item_type, question), options)
+
+    def get_context(self, item_type, question):
+        """
+        Kontekst przedmiotu dla modelu: cały opis przygotowany przy starcie albo,
+        przy włączonym indeksie fragmentów, tylko fragmenty pasujące do pytania.
+        """
+        with STAGE_SECONDS.time(backend=self.name, stage="context_load"):
+            if self.item_store.retrieval is not None:
+                item = self.item_store.retrieve(item_type, self.context_view, question)
+            else:
+                item = self.item_store.get(item_type, self.context_view)  # Kontekst przygotowany przy starcie
+        if not item:
+            raise BackendError("Context not found", 404)  # Błąd, jeśli kontekst nie został znaleziony
+        return item
+
+    def refine(self, question, initial_answer, options):
+        """Dopracowuje gotową krótką odpowiedź do pełnego zdania (/refine)."""
+        raise BackendError(f"Model {self.name} does not support refinement", 400)
+
+    def on_reload(self):
+        # Wywoływane po przeładowaniu opisów przedmiotów
+        if self.answer_cache is not None:
+            self.answer_cache.clear()  # Odpowiedzi mogły zależeć od starych opisów
+
+    def cache_stats(self):
+        return self.answer_cache.stats() if self.answer_cache is not None else None
+
+    @property
+    def context_view(self):
+        return self.model_name
+
+    @property
+    def model(self):
+        """Załadowany model (torch.nn.Module) albo None, gdy model działa tylko w replikach."""
+        raise NotImplementedError
+
+    @property
+    def tokenizer(self):
+        """Tokenizer załadowanego modelu."""
+        raise NotImplementedError
+
+    def _load(self):
+        raise NotImplementedError
+
+    @property
+    def replica_spec(self):
+        """Opis modelu dla puli replik (load_replica); None, jeśli backend nie korzysta z replik."""
+        return None
+
+    @property
+    def replica_specs(self):
+        # Wszystkie modele backendu ładowane w replikach
+        return [self.replica_spec] if self.replica_spec is not None else []
+
+    def _pipeline(self, task):
+        # Przy puli replik proces serwera potrzebuje tylko tokenizera - model ładują repliki
+        if get_replica_pool() is not None:
+            self._tokenizer = load_tokenizer(self.model_name)
+            self._inference_lock = threading.Lock()
+            return None
+        # Pipeline wspólny dla backendów tego samego modelu (np. qa i ekstrakcja w trybie hybrid)
+        pipe, self.quantization, self._inference_lock = get_pipeline(task, self.MODEL_CLASS, self.model_name, self.quantize)
+        if self.quantization != self.quantize:
+            logger.warning("Quantization not supported, using fp32", extra=fields(backend=self.name, quantize=self.quantize, device=DEVICE))
+        self._tokenizer = pipe.tokenizer
+        return pipe
+
+    def _call_pipeline(self, pipe, *args, **kwargs):
+        # Wywołanie pipeline'u w wolnej replice (REPLICAS > 0) albo lokalnie, pod blokadą
+        pool = get_replica_pool()
+        if pool is not None:
+            return task_result(pool.submit(self.replica_spec, "__call__", args, kwargs))
+        with self._inference_lock:
+            return pipe(*args, **kwargs)
+
+    def _answer(self, item_type, question, item, options):
+        raise NotImplementedError
+
+    def _stream(self, item_type, question, item, options):
+        # Modele bez strumieniowania zwracają całą odpowiedź jako jeden fragment
+        result = self._answer(item_type, question, item, options)
+        yield "token", {"text": result["response"]}
+        yield "done", result
+
+
+class QABackend(Backend):
+    """
+    Ekstrakcyjny model pytanie-odpowiedź (deepset/roberta-base-squad2).
+    W trybie "window" długi opis dzielony jest na nakładające się okna (doc_stride),
+    które trafiają do modelu jednym batchem; wybierana jest najlepiej oceniona odpowiedź
+    ze wszystkich okien. W trybie "truncate" kontekst jest obcinany do 450 tokenów.
+    """
+
+    MODEL_CLASS = AutoModelForQuestionAnswering
+    MAX_CONTEXT_TOKENS = 450
+
+    def __init__(self, name, model_name, item_store, quantize=None, context_mode=QA_CONTEXT_MODE, cache_answers=True):
+        super().__init__(name, model_name, item_store, quantize)
+        if context_mode not in ("window", "truncate"):
+            raise ValueError(f"Unknown QA context mode: {context_mode}")
+        self.context_mode = context_mode
+        self.cache_answers = cache_answers  # False dla ekstrakcji w trybie hybrid (pamięć ma backend FLAN-T5)
+
+    @property
+    def context_view(self):
+        return f"{self.model_name}:{self.context_mode}"  # Pełny lub obcięty kontekst
+
+    @property
+    def replica_spec(self):
+        return "pipeline", "question-answering", self.MODEL_CLASS, self.model_name, self.quantize
+
+    @property
+    def model(self):
+        return self.qa_pipeline.model if self.qa_pipeline is not None else None
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def _load(self):
+        self.qa_pipeline = self._pipeline("question-answering")
+        self.answer_cache = AnswerCache() if self.cache_answers else None
+        self.item_store.add_view(self.context_view, self.preprocess_context)
+
+    def preprocess_context(self, context):
+        tokens = self.tokenizer.encode(context)
+        if self.context_mode == "window":
+            if len(tokens) > QA_MAX_SEQ_LEN:
+                logger.debug("Context split into overlapping windows", extra=fields(backend=self.name, tokens=len(tokens)))
+            return context, tokens  # Pełny kontekst, okna tworzy pipeline
+        if len(tokens) > self.MAX_CONTEXT_TOKENS:
+            logger.warning("Context too long, truncating", extra=fields(backend=self.name, tokens=len(tokens), maxTokens=self.MAX_CONTEXT_TOKENS))
+            tokens = tokens[:self.MAX_CONTEXT_TOKENS]
+            context = self.tokenizer.decode(tokens, skip_special_tokens=True)
+        return context, tokens
+
+    def extract(self, context, question):
+        """Najlepiej oceniony fragment kontekstu: wynik pipeline'u ({"answer", "score", ...})."""
+        window_kwargs = {}
+        if self.context_mode == "window":
+            window_kwargs = {
+                "max_seq_len": QA_MAX_SEQ_LEN,  # Długość okna
+                "doc_stride": QA_DOC_STRIDE,  # Nakładanie się okien, aby odpowiedź nie została przecięta
+                "batch_size": QA_WINDOW_BATCH_SIZE  # Wszystkie okna w jednym (lub kilku) wywołaniach modelu
+            }
+
+        with STAGE_SECONDS.time(backend=self.name, stage="generation"):
+            result = self._call_pipeline(
+                self.qa_pipeline,
+                question=question,
+                context=context,
+                max_answer_len=50,
+                handle_impossible_answer=True,
+                **window_kwargs
+            )
+
+        logger.debug("Answer score", extra=fields(backend=self.name, score=round(float(result['score']), 4)))
+        return result
+
+    def get_answer(self, context, question):
+        try:
+            logger.debug("Processing question", extra=fields(backend=self.name, question=question))
+            result = self.extract(context, question)
+
+            if result['score'] < 0.1:
+                return "Nie mam wystarczających informacji, aby odpowiedzieć na to pytanie."
+
+            answer = result['answer'].strip()
+            logger.debug("Generated answer", extra=fields(backend=self.name, answer=answer))
+
+            if len(answer) < 2 or question.lower() in answer.lower():
+                return "Nie jestem pewien odpowiedzi na to pytanie."
+
+            # Prosta, ale kompletna odpowiedź
+            return answer
+
+        except Exception:
+            logger.exception("Error in get_answer", extra=fields(backend=self.name))
+            return "Przepraszam, wystąpił problem z przetworzeniem Twojego pytania."
+
+    def _answer(self, item_type, question, item, options):
+        cached = self.answer_cache.get(item_type, question)
+        if cached is not None:
+            return {"response": cached, "cached": True}
+
+        answer = self.get_answer(item.text, question)
+        if not answer.startswith("Przepraszam"):
+            self.answer_cache.put(item_type, question, answer)
+        return {"response": answer, "cached": False}
+
+
+class SummarizationBackend(Backend):
+    """Model podsumowujący (facebook/bart-large-cnn) odpowiadający na pytania o opis przedmiotu."""
+
+    MAX_CONTEXT_TOKENS = 800  # Zostawia miejsce na prompt i pytanie
+
+    @property
+    def model(self):
+        return self.summarizer.model if self.summarizer is not None else None
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    @property
+    def replica_spec(self):
+        return "pipeline", "summarization", self.MODEL_CLASS, self.model_name, self.quantize
+
+    def _load(self):
+        self.summarizer = self._pipeline("summarization")
+        self.answer_cache = AnswerCache()  # Pamięć gotowych odpowiedzi z kluczem (typ przedmiotu, pytanie)
+        self.item_store.add_view(self.context_view, self.truncate_context)
+
+    def truncate_context(self, context):
+        """Truncate context to fit within BART's limits, leaving room for prompt"""
+        tokens = self.tokenizer.encode(context)  # Tokenizacja kontekstu
+        if len(tokens) > self.MAX_CONTEXT_TOKENS:  # Sprawdzenie długości tokenów
+            logger.warning("Context too long, truncating", extra=fields(backend=self.name, tokens=len(tokens), maxTokens=self.MAX_CONTEXT_TOKENS))  # Logowanie o zbyt długim kontekście
+            tokens = tokens[:self.MAX_CONTEXT_TOKENS]  # Skrócenie kontekstu
+            context = self.tokenizer.decode(tokens, skip_special_tokens=True)  # Dekodowanie tokenów
+        else:
+            logger.debug("Context length", extra=fields(backend=self.name, tokens=len(tokens)))  # Logowanie długości kontekstu
+        return context, tokens  # Zwrócenie przetworzonego kontekstu i tokenów
+
+    def get_answer(self, context, question):
+        try:
+            prompt = f"""Please answer the following question about an item based only on the provided description.
+        If the information is not in the description, respond with "Based on the description, I cannot answer this question."
+
+        Item Description:
+        {context}
+
+        Question: {question}
+
+        Answer:"""  # Przygotowanie promptu
+
+            logger.debug("Processing prompt", extra=fields(backend=self.name, question=question, prompt=prompt))  # Logowanie przetwarzania promptu
+
+            with self._inference_lock:
+                # Sprawdź długość całego promptu
+                prompt_tokens = len(self.tokenizer.encode(prompt))  # Obliczenie długości tokenów promptu
+            logger.debug("Total prompt length", extra=fields(backend=self.name, tokens=prompt_tokens))  # Logowanie długości promptu
+
+            if prompt_tokens > 1024:  # Sprawdzenie, czy długość promptu przekracza limit
+                logger.warning("Prompt exceeds model's maximum token limit", extra=fields(backend=self.name, tokens=prompt_tokens))  # Logowanie ostrzeżenia
+                return "Error: Input too long for processing"  # Zwrócenie błędu
+
+            with STAGE_SECONDS.time(backend=self.name, stage="generation"):
+                summary = self._call_pipeline(
+                    self.summarizer,
+                    prompt,
+                    max_length=50,  # Maksymalna długość odpowiedzi
+                    min_length=10,  # Minimalna długość odpowiedzi
+                    do_sample=False,  # Wyłączenie próbkowania
+                    truncation=True  # Włączenie skracania
+                )
+
+            answer = summary[0]['summary_text'].strip()  # Otrzymanie odpowiedzi
+            logger.debug("Generated answer", extra=fields(backend=self.name, answer=answer))  # Logowanie wygenerowanej odpowiedzi
+
+            if len(answer) < 5 or question.lower() in answer.lower():  # Sprawdzenie, czy odpowiedź jest sensowna
+                return "Based on the description, I cannot answer this question."
+
+            return answer  # Zwrócenie odpowiedzi
+
+        except Exception:
+            logger.exception("Error in get_answer", extra=fields(backend=self.name))  # Logowanie błędu w funkcji get_answer
+            return "Sorry, I couldn't generate an answer at this time."  # Zwrócenie błędu
+
+    def _answer(self, item_type, question, item, options):
+        cached = self.answer_cache.get(item_type, question)  # Sprawdzenie pamięci odpowiedzi
+        if cached is not None:
+            return {"response": cached, "cached": True}
+
+        answer = self.get_answer(item.text, question)  # Uzyskanie odpowiedzi
+        if not answer.startswith(("Sorry", "Error")):  # Błędów nie zapamiętujemy
+            self.answer_cache.put(item_type, question, answer)
+        return {"response": answer, "cached": False}  # Zwrócenie odpowiedzi
+
+
+def format_answer(answer):
+    # Formatowanie krótkiej odpowiedzi: bez wstępu, wielka litera na początku, kropka na końcu
+    answer = answer.replace(ANSWER_INTRO, "").strip()  # Usunięcie wstępu
+
+    if answer.lower().startswith("the "):  # Jeśli odpowiedź zaczyna się od "the"
+        answer = answer[0].upper() + answer[1:]  # Ustawienie wielkiej litery na początku
+    elif answer:
+        answer = answer[0].upper() + answer[1:].lower()  # Ustawienie wielkiej litery na początku
+
+    if not answer.endswith('.'):  # Jeśli odpowiedź nie kończy się kropką
+        answer += '.'  # Dodanie kropki na końcu
+    return answer
+
+
+def format_span(span):
+    # Fragment opisu wskazany przez model qa: bez zmiany wielkości liter (nazwy własne), z kropką na końcu
+    span = span.strip()
+    if span:
+        span = span[0].upper() + span[1:]
+    if not span.endswith('.'):
+        span += '.'
+    return span
+
+
+def format_sentence(answer, capitalize=True):
+    # Formatowanie odpowiedzi w pełnym zdaniu
+    answer = answer.strip()
+    if capitalize and answer:
+        answer = answer[0].upper() + answer[1:]  # Wielka litera na początku zdania
+    if not answer.endswith('.'):  # Jeśli odpowiedź nie kończy się kropką
+        answer += '.'  # Dodanie kropki na końcu
+    return answer
+
+
+class IncrementalFormatter:
+    """
+    Stosuje formatowanie odpowiedzi (format_fn) do tekstu napływającego fragmentami.
+    Każdy fragment jest formatowany razem z dotychczasowym tekstem, a klient dostaje tylko
+    nową część. Tekst jest wstrzymywany, dopóki hold(tekst) jest prawdziwe (np. początek
+    odpowiedzi może być jeszcze usuwanym wstępem), a kropka dodawana jest dopiero na końcu.
+    """
+
+    def __init__(self, format_fn, hold=None):
+        self.format_fn = format_fn
+        self.hold = hold
+        self.text = ""
+        self.emitted = ""
+
+    def feed(self, chunk):
+        """Dodaje fragment wygenerowanego tekstu i zwraca nową część sformatowanej odpowiedzi."""
+        self.text += chunk
+        if self.hold is not None and self.hold(self.text.strip()):
+            return ""
+        formatted = self.format_fn(self.text)
+        if not self.text.rstrip().endswith('.'):
+            formatted = formatted[:-1]  # Kropka dodana przez formatowanie nie jest jeszcze ostateczna
+        return self._emit(formatted)
+
+    def finish(self):
+        """Zwraca brakującą końcówkę odpowiedzi po zakończeniu generowania."""
+        return self._emit(self.format_fn(self.text))
+
+    @property
+    def result(self):
+        return self.format_fn(self.text)
+
+    def _emit(self, formatted):
+        if not formatted.startswith(self.emitted):
+            return ""  # Formatowanie zmieniło już wysłany tekst; poprawna całość trafia do zdarzenia "done"
+        delta = formatted[len(self.emitted):]
+        self.emitted = formatted
+        return delta
+
+
+def hold_answer_intro(text):
+    # Początek odpowiedzi, który może być jeszcze wstępem lub słowem "the"
+    return len(text) < 4 or ANSWER_INTRO.startswith(text)
+
+
+class Seq2SeqModel:
+    """
+    Załadowany model FLAN-T5 współdzielony przez wszystkie backendy używające tej samej
+    nazwy modelu (wagi, tokenizer, pamięć enkodera i kolejki batchujące).
+    Bez load_weights (proces serwera przy puli replik) ładowany jest tylko tokenizer,
+    a całą inferencję wykonują repliki.
+    """
+
+    def __init__(self, model_name, quantize=QUANTIZE, load_weights=True):
+        self.model_name = model_name
+        self.quantize = quantize  # Żądany tryb kwantyzacji (opis modelu dla replik)
+        self.tokenizer = load_tokenizer(model_name)  # Ładowanie tokenizera
+        self.model = None
+        self.quantization = None
+        self.encoder_cache = None
+        self._batchers = {}
+        self._lock = threading.Lock()
+        if load_weights:
+            self.load_weights()
+
+    def load_weights(self):
+        """Ładuje wagi modelu w tym procesie (tylko raz)."""
+        with self._lock:
+            if self.model is not None:
+                return self.model
+            logger.info("Loading model weights", extra=fields(model=self.model_name, quantize=self.quantize))
+            model = load_model(AutoModelForSeq2SeqLM, self.model_name).to(DEVICE)  # Ładowanie modelu (mmap z lokalnej kopii)
+            model, self.quantization = quantize_model(model, self.quantize, DEVICE)  # Opcjonalna kwantyzacja wag
+            if self.quantization != self.quantize:
+                logger.warning("Quantization not supported, using fp32", extra=fields(model=self.model_name, quantize=self.quantize, device=DEVICE))
+            model.eval()  # Tryb inferencji
+            # Pamięć podręczna enkodera dla stałej części promptu (instrukcja + kontekst przedmiotu)
+            self.encoder_cache = EncoderCache(model, self.tokenizer, DEVICE)
+            self.model = model
+            return model
+
+    def generate(self, prompt, stage, **generate_kwargs):
+        """
+        Generuje tekst dla jednego promptu przez kolejkę danego etapu (np. "answer", "refine").
+        Prompt w postaci (prefiks, sufiks) korzysta z pamięci enkodera. Przy włączonej puli
+        replik prompt trafia do wspólnej kolejki replik, które same łączą go w batche.
+        """
+        return task_result(self.submit(prompt, stage, **generate_kwargs))
+
+    def submit(self, prompt, stage, **generate_kwargs):
+        """Jak generate(), ale bez czekania: zwraca Future z wygenerowanym tekstem."""
+        key = (isinstance(prompt, tuple), tuple(sorted(generate_kwargs.items())))
+        pool = get_replica_pool()
+        if pool is not None:
+            spec = ("seq2seq", self.model_name, self.quantize)
+            return pool.submit(spec, "run_replica_batch", (prompt, generate_kwargs, stage), batch_key=(stage, key))
+        return self._batcher(stage).submit((prompt, generate_kwargs), key)
+
+    def stream(self, prompt, **generate_kwargs):
+        """
+        Generuje tekst dla jednego promptu z pominięciem kolejki, zwracając kolejne fragmenty.
+        Repliki nie przesyłają fragmentów, więc przy puli replik cała odpowiedź powstaje
+        w kolejce replik i zwracana jest jako jeden fragment.
+        """
+        if self.model is None and get_replica_pool() is not None:
+            yield self.generate(prompt, "stream", **generate_kwargs)
+            return
+        encoder_cache = self.encoder_cache if isinstance(prompt, tuple) else None
+        yield from stream_generate(self.model, self.tokenizer, prompt, DEVICE, encoder_cache=encoder_cache, **generate_kwargs)
+
+    def embed(self, text):
+        # Wektor tekstu: uśrednione stany enkodera (do wyszukiwania podobnych pytań w pamięci odpowiedzi)
+        pool = get_replica_pool()
+        if pool is not None and self.model is None:
+            return task_result(pool.submit(("seq2seq", self.model_name, self.quantize), "embed", (text,)))
+        with TOKENIZER_LOCK:
+            inputs = self.tokenizer(text, return_tensors="pt").to(DEVICE)
+        with torch.no_grad():
+            states = self.model.get_encoder()(input_ids=inputs["input_ids"]).last_hidden_state[0]
+        return states.mean(dim=0).float()
+
+    def preprocess_context(self, context):
+        # Tokenizacja kontekstu i skrócenie go do maksymalnej długości
+        tokens = self.tokenizer.encode(context)
+        if len(tokens) > MAX_CONTEXT_LENGTH:
+            logger.warning("Context too long, truncating", extra=fields(model=self.model_name, tokens=len(tokens), maxTokens=MAX_CONTEXT_LENGTH))
+            tokens = self.tokenizer.encode(context, max_length=MAX_CONTEXT_LENGTH, truncation=True)
+        return self.tokenizer.decode(tokens, skip_special_tokens=True), tokens  # Dekodowanie tokenów
+
+    def _batcher(self, stage):
+        with self._lock:
+            if stage not in self._batchers:
+                # Kolejka zbierająca równoległe zapytania w batche (rozmiar i czas oczekiwania konfigurowalne)
+                self._batchers[stage] = MicroBatcher(
+                    functools.partial(self._run_batch, stage=stage), MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS, name=f"{stage}-batcher"
+                )
+            return self._batchers[stage]
+
+    def queue_depths(self):
+        with self._lock:
+            return {stage: batcher.queue_depth() for stage, batcher in self._batchers.items()}
+
+    def run_replica_batch(self, items):
+        # Batch zebrany przez replikę: elementy (prompt, parametry, etap) o wspólnym kluczu
+        return self._run_batch([(prompt, generate_kwargs) for prompt, generate_kwargs, _ in items], stage=items[0][2])
+
+    def _run_batch(self, items, stage):
+        # Wszystkie elementy grupy mają te same parametry generowania (klucz batchera)
+        prompts = [prompt for prompt, _ in items]
+        generate_kwargs = items[0][1]
+        encoder_cache = self.encoder_cache if isinstance(prompts[0], tuple) else None
+        timings = {}
+        results = generate_batch(self.model, self.tokenizer, prompts, DEVICE, encoder_cache=encoder_cache, timings=timings, **generate_kwargs)
+        BATCH_SIZE.observe(len(prompts), model=self.model_name, batcher=stage)
+        for step, seconds in timings.items():
+            MODEL_STEP_SECONDS.observe(seconds, model=self.model_name, batcher=stage, step=step)
+        return results
+
+
+_seq2seq_models = {}
+_seq2seq_lock = threading.Lock()
+
+
+def seq2seq_queue_depths():
+    """Liczba promptów czekających w kolejkach batchujących: {(model, etap): liczba}."""
+    with _seq2seq_lock:
+        models = list(_seq2seq_models.values())
+    return {(model.model_name, stage): depth for model in models for stage, depth in model.queue_depths().items()}
+
+
+def get_seq2seq_model(model_name, quantize=QUANTIZE):
+    """
+    Zwraca współdzieloną instancję Seq2SeqModel (ładując ją przy pierwszym użyciu).
+    Przy puli replik proces serwera nie ładuje wag - generowanie wykonują repliki.
+    """
+    with _seq2seq_lock:
+        key = (model_name, quantize)
+        if key not in _seq2seq_models:
+            _seq2seq_models[key] = Seq2SeqModel(model_name, quantize, load_weights=get_replica_pool() is None)
+        return _seq2seq_models[key]
+
+
+def build_pipeline(task, model_class, model_name, quantize=QUANTIZE):
+    """
+    Pipeline na modelu z lokalnej kopii safetensors (mmap), jeśli ją przygotowano,
+    z opcjonalną kwantyzacją. Zwraca (pipeline, faktycznie użyty tryb kwantyzacji).
+    """
+    pipe = pipeline(
+        task,
+        model=load_model(model_class, model_name),
+        tokenizer=load_tokenizer(model_name),
+        device=0 if DEVICE == "cuda" else -1  # Ustawienie urządzenia
+    )
+    pipe.model, quantization = quantize_model(pipe.model, quantize, DEVICE)
+    return pipe, quantization
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(task, model_class, model_name, quantize=QUANTIZE):
+    """
+    Zwraca współdzielony pipeline (ładując go przy pierwszym użyciu) jako
+    (pipeline, tryb kwantyzacji, blokada) - pipeline nie jest bezpieczny wątkowo.
+    """
+    with _pipelines_lock:
+        key = (task, model_name, quantize)
+        if key not in _pipelines:
+            pipe, quantization = build_pipeline(task, model_class, model_name, quantize)
+            _pipelines[key] = (pipe, quantization, threading.Lock())
+        return _pipelines[key]
+
+
+def load_replica(spec):
+    """Tworzy w procesie repliki model opisany przez replica_spec backendu."""
+    if spec[0] == "seq2seq":
+        return Seq2SeqModel(spec[1], spec[2])
+    _, task, model_class, model_name, quantize = spec
+    return build_pipeline(task, model_class, model_name, quantize)[0]
+
+
+class Text2TextBackend(Backend):
+    """
+    Generatywny model FLAN-T5. W wariancie dwuetapowym (two_stage) odpowiedź wstępna
+    jest dopracowywana do pełnego zdania (tryb quality) lub generowana jednym przejściem (tryb fast).
+    Etap dopracowania może używać osobnego, mniejszego modelu (refine_model).
+    W trybie hybrid odpowiedź wstępną zastępuje fragment opisu wskazany przez model qa
+    (extractor), a dopracowanie dostaje tylko ten fragment i pytanie.
+    """
+
+    def __init__(self, name, model_name, item_store, quantize=None, two_stage=False, refine_model=None):
+        super().__init__(name, model_name, item_store, quantize)
+        self.two_stage = two_stage
+        self.refine_model_name = (refine_model or REFINE_MODEL or model_name) if two_stage else model_name
+        # Model qa trybu hybrid, ładowany przy starcie tylko, gdy hybrid jest trybem domyślnym
+        self.extractor = QABackend(f"{name}:extract", HYBRID_QA_MODEL, item_store, quantize, cache_answers=False) if two_stage else None
+
+    @property
+    def model(self):
+        return self.seq2seq.model
+
+    @property
+    def tokenizer(self):
+        return self.seq2seq.tokenizer
+
+    @property
+    def replica_spec(self):
+        return "seq2seq", self.model_name, self.quantize
+
+    @property
+    def replica_specs(self):
+        specs = [self.replica_spec, ("seq2seq", self.refine_model_name, self.quantize)]
+        if self.extractor is not None and DEFAULT_MODE == "hybrid":
+            specs.append(self.extractor.replica_spec)
+        return list(dict.fromkeys(specs))
+
+    def _load(self):
+        self.seq2seq = get_seq2seq_model(self.model_name, self.quantize)
+        self.refine_seq2seq = get_seq2seq_model(self.refine_model_name, self.quantize)  # Ten sam obiekt, jeśli model jest ten sam
+        self.quantization = self.seq2seq.quantization  # None przy puli replik (wagi tylko w replikach)
+        self.answer_cache = AnswerCache(embed_fn=self.seq2seq.embed)  # Pamięć gotowych odpowiedzi
+        self.refine_cache = AnswerCache(exact=True)  # Pamięć dopracowanych odpowiedzi: dokładna para (odpowiedź wstępna, pytanie)
+        self.item_store.add_view(self.context_view, self.seq2seq.preprocess_context)  # Widok wspólny dla backendów tego samego modelu
+        if self.extractor is not None and DEFAULT_MODE == "hybrid":
+            self.extractor.load()
+
+    def on_reload(self):
+        super().on_reload()
+        if self.seq2seq.encoder_cache is not None:
+            self.seq2seq.encoder_cache.clear()  # Usunięcie nieaktualnych prefiksów
+        if self.extractor is not None and self.extractor.loaded:
+            self.extractor.on_reload()
+
+    def cache_stats(self):
+        stats = super().cache_stats()
+        stats["refine"] = self.refine_cache.stats()  # Pamięć /refine (niezależna od opisów przedmiotów)
+        return stats
+
+    def refine(self, question, initial_answer, options):
+        """
+        Dopracowanie odpowiedzi podanej przez klienta (np. z modelu qa) bez ponownego
+        generowania z pełnym opisem przedmiotu. Prompty trafiają do kolejki "refine",
+        więc równoległe zapytania (i /refine w wersji batch) łączone są w batche.
+        """
+        self.load()
+        decoding = self.resolve_decoding(options)
+        start_time = time.time()
+        cached = self.refine_cache.get(initial_answer, question, decoding)  # Te same pary (pytanie, odpowiedź)
+        if cached is not None:
+            refined_answer = cached
+        else:
+            refined_answer = self.generate_full_sentence_answer(question, initial_answer, decoding)
+            if not refined_answer.startswith("An error occurred"):  # Błędów nie zapamiętujemy
+                self.refine_cache.put(initial_answer, question, refined_answer, decoding)
+        duration = time.time() - start_time
+        logger.info("Answer refined", extra=fields(backend=self.name, decoding=decoding, seconds=round(duration, 3), cached=cached is not None))
+        return {
+            "refinedResponse": refined_answer,
+            "timeTaken": float(duration),
+            "decoding": decoding,
+            "cached": cached is not None
+        }
+
+    def build_context_prefix(self, context):
+        # Stała część promptu (zależna tylko od przedmiotu), wspólna dla obu trybów generowania
+        return f"""Generate a factual answer to the question using only the context. 
+Use complete sentences. If information is missing, say "I don't know".
+
+Context: {context}
+
+"""
+
+    def answer_prompt(self, question, context):
+        # Prompt w postaci (prefiks, sufiks): stały prefiks i część zależna od pytania
+        suffix = f"""Question: {question}
+Answer: {ANSWER_INTRO}"""
+        return self.build_context_prefix(context), suffix
+
+    def refine_prompt(self, question, initial_answer):
+        return f"""Based on the original question and the initial answer provided below,
+please generate a refined, complete sentence that fully explains the answer. 
+In your answer, make sure to include any relevant context from the question if needed.
+
+Original Question: {question}
+
+Initial Answer: {initial_answer}
+
+Refined, complete sentence answer:"""  # Przygotowanie promptu dla dopracowanej odpowiedzi
+
+    def single_pass_prompt(self, question, context):
+        prefix = self.build_context_prefix(context)  # Ten sam prefiks co w generate_answer (wspólna pamięć enkodera)
+        suffix = f"""Question: {question}
+Answer the question with one complete sentence that restates the subject of the question:"""
+        return prefix, suffix
+
+    def generation_kwargs(self, decoding, temperature, max_new_tokens):
+        return dict(
+            num_return_sequences=1,  # Liczba generowanych odpowiedzi
+            repetition_penalty=1.0,  # Kara za powtarzanie się
+            clean_up_tokenization_spaces=True,  # Czyszczenie spacji po tokenizacji
+            **decoding_kwargs(decoding, temperature, max_new_tokens)  # Profil dekodowania i limit długości
+        )
+
+    def generate_answer(self, question, context, decoding=DECODING):
+        try:
+            # Generowanie odpowiedzi za pomocą modelu (prompt trafia do wspólnego batcha)
+            with STAGE_SECONDS.time(backend=self.name, stage="generation"):
+                answer = self.seq2seq.generate(
+                    self.answer_prompt(question, context),
+                    stage="answer",
+                    **self.generation_kwargs(decoding, 0.7, ANSWER_MAX_NEW_TOKENS)
+                ).strip()  # Otrzymanie odpowiedzi
+            with STAGE_SECONDS.time(backend=self.name, stage="postprocess"):
+                return format_answer(answer)  # Formatowanie odpowiedzi
+
+        except Exception:
+            logger.exception("Generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas generowania odpowiedzi
+            return "An error occurred while generating the answer."  # Zwrócenie komunikatu o błędzie
+
+    def generate_full_sentence_answer(self, question, initial_answer, decoding=DECODING):
+        """
+        Ta funkcja otrzymuje oryginalne zapytanie oraz wygenerowaną wcześniej odpowiedź,
+        a następnie tworzy dopracowaną odpowiedź w pełnym zdaniu.
+        """
+        try:
+            # Generowanie dopracowanej odpowiedzi
+            with STAGE_SECONDS.time(backend=self.name, stage="refinement"):
+                answer = self.refine_seq2seq.generate(
+                    self.refine_prompt(question, initial_answer),
+                    stage="refine",
+                    **self.generation_kwargs(decoding, 0.8, SENTENCE_MAX_NEW_TOKENS)  # Lekko podniesiona temperatura dla większej kreatywności
+                )
+            with STAGE_SECONDS.time(backend=self.name, stage="postprocess"):
+                return format_sentence(answer, capitalize=False)  # Zwrócenie dopracowanej odpowiedzi
+        except Exception:
+            logger.exception("Refinement generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas dopracowywania odpowiedzi
+            return "An error occurred while refining the answer."  # Zwrócenie komunikatu o błędzie
+
+    def generate_refined_answer(self, question, context, decoding=DECODING):
+        """
+        Tryb quality jako potok dwóch etapów z osobnymi kolejkami: gdy kolejka "answer" zwróci
+        odpowiedź wstępną, jej formatowanie i zgłoszenie do kolejki "refine" odbywa się od razu
+        w wątku kolejki, bez powrotu do wątku zapytania. Odpowiedzi wstępne kolejnych zapytań
+        generowane są więc równolegle z dopracowywaniem wcześniejszych, a każdy etap łączy
+        prompty w batche niezależnie. Wynik jest taki sam jak generate_answer +
+        generate_full_sentence_answer. Zwraca (odpowiedź wstępna, dopracowana odpowiedź).
+        """
+        result = Future()
+        context_vars = contextvars.copy_context()  # Identyfikator zapytania w logach z wątków kolejek
+        start_time = time.perf_counter()
+
+        def on_answer(answer_future):
+            STAGE_SECONDS.observe(time.perf_counter() - start_time, backend=self.name, stage="generation")
+            try:
+                with STAGE_SECONDS.time(backend=self.name, stage="postprocess"):
+                    initial_answer = format_answer(answer_future.result().strip())  # Formatowanie odpowiedzi
+            except Exception:
+                logger.exception("Generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas generowania odpowiedzi
+                initial_answer = "An error occurred while generating the answer."
+            refine_start = time.perf_counter()
+
+            def on_refined(refine_future):
+                STAGE_SECONDS.observe(time.perf_counter() - refine_start, backend=self.name, stage="refinement")
+                try:
+                    with STAGE_SECONDS.time(backend=self.name, stage="postprocess"):
+                        refined_answer = format_sentence(refine_future.result(), capitalize=False)
+                except Exception:
+                    logger.exception("Refinement generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas dopracowywania odpowiedzi
+                    refined_answer = "An error occurred while refining the answer."
+                result.set_result((initial_answer, refined_answer))
+
+            self.refine_seq2seq.submit(
+                self.refine_prompt(question, initial_answer),
+                stage="refine",
+                **self.generation_kwargs(decoding, 0.8, SENTENCE_MAX_NEW_TOKENS)  # Lekko podniesiona temperatura dla większej kreatywności
+            ).add_done_callback(lambda future: context_vars.copy().run(on_refined, future))
+
+        def on_answer_safe(answer_future):
+            try:
+                on_answer(answer_future)
+            except Exception as e:
+                result.set_exception(e)  # Np. błąd zgłoszenia do kolejki dopracowania
+
+        self.seq2seq.submit(
+            self.answer_prompt(question, context),
+            stage="answer",
+            **self.generation_kwargs(decoding, 0.7, ANSWER_MAX_NEW_TOKENS)
+        ).add_done_callback(lambda future: context_vars.copy().run(on_answer_safe, future))
+        return task_result(result, 2 * REPLICA_TASK_TIMEOUT)  # Dwa etapy
+
+    def extract_span(self, item_type, question):
+        """
+        Fragment opisu odpowiadający na pytanie według modelu qa albo None, gdy ocena fragmentu
+        jest niższa niż HYBRID_MIN_SCORE (lub model nie wskazał odpowiedzi).
+        """
+        try:
+            self.extractor.load()
+            with STAGE_SECONDS.time(backend=self.name, stage="extraction"):
+                item = self.extractor.get_context(item_type, question)
+                result = self.extractor.extract(item.text, question)
+        except Exception:
+            logger.exception("Extraction error", extra=fields(backend=self.name))
+            HYBRID_ANSWERS.inc(backend=self.name, path="fallback")
+            return None
+        span, score = result['answer'].strip(), float(result['score'])
+        if score < HYBRID_MIN_SCORE or len(span) < 2:
+            logger.debug("Low extraction score", extra=fields(backend=self.name, score=round(score, 4), minScore=HYBRID_MIN_SCORE))
+            HYBRID_ANSWERS.inc(backend=self.name, path="fallback")
+            return None
+        HYBRID_ANSWERS.inc(backend=self.name, path="span")
+        return span
+
+    def generate_hybrid_answer(self, item_type, question, context, decoding=DECODING):
+        """
+        Tryb hybrid: model qa wskazuje fragment opisu, a FLAN-T5 dopracowuje go do pełnego zdania
+        na podstawie samego pytania i fragmentu (kilkadziesiąt tokenów zamiast całego opisu).
+        Przy niskiej ocenie fragmentu odpowiedź powstaje jak w trybie quality, z pełnego kontekstu.
+        Zwraca (odpowiedź wstępna, dopracowana odpowiedź).
+        """
+        span = self.extract_span(item_type, question)
+        if span is None:
+            return self.generate_refined_answer(question, context, decoding)
+        initial_answer = format_span(span)
+        return initial_answer, self.generate_full_sentence_answer(question, initial_answer, decoding)
+
+    def generate_single_pass_answer(self, question, context, decoding=DECODING):
+        """
+        Tryb szybki: odpowiedź w pełnym zdaniu w jednym przejściu modelu,
+        bez osobnego etapu dopracowania (generate_answer + generate_full_sentence_answer).
+        """
+        try:
+            with STAGE_SECONDS.time(backend=self.name, stage="generation"):
+                answer = self.seq2seq.generate(
+                    self.single_pass_prompt(question, context),
+                    stage="answer",
+                    **self.generation_kwargs(decoding, 0.7, SENTENCE_MAX_NEW_TOKENS)
+                )
+            with STAGE_SECONDS.time(backend=self.name, stage="postprocess"):
+                return format_sentence(answer)
+        except Exception:
+            logger.exception("Generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas generowania odpowiedzi
+            return "An error occurred while generating the answer."  # Zwrócenie komunikatu o błędzie
+
+    def resolve_mode(self, options):
+        mode = options.get('mode', DEFAULT_MODE)
+        if mode not in GENERATION_MODES:
+            raise BackendError(f"Unknown mode: {mode}", 400)  # Błąd, jeśli tryb jest nieznany
+        return mode
+
+    def resolve_decoding(self, options):
+        decoding = options.get('decoding', DECODING)
+        if decoding not in DECODING_PROFILES:
+            raise BackendError(f"Unknown decoding profile: {decoding}", 400)  # Błąd, jeśli profil jest nieznany
+        return decoding
+
+    def _answer(self, item_type, question, item, options):
+        processed_context = item.text  # Skrócony kontekst
+        decoding = self.resolve_decoding(options)  # Profil dekodowania: greedy, beam lub sampling
+        if not self.two_stage:
+            return self._answer_single(item_type, question, processed_context, decoding)
+
+        mode = self.resolve_mode(options)  # Tryb generowania: fast lub quality
+
+        # Start timing
+        start_time = time.time()  # Rozpoczęcie pomiaru czasu
+
+        cached = self.answer_cache.get(item_type, question, (mode, decoding))  # Sprawdzenie pamięci odpowiedzi
+        if cached is not None:
+            initial_answer, refined_answer = cached
+        else:
+            if mode == "fast":
+                initial_answer = None  # Brak etapu wstępnej odpowiedzi
+                refined_answer = self.generate_single_pass_answer(question, processed_context, decoding)  # Jedno przejście modelu
+            elif mode == "hybrid":
+                # Fragment z modelu qa i jego dopracowanie (albo pełny kontekst przy niskiej ocenie)
+                initial_answer, refined_answer = self.generate_hybrid_answer(item_type, question, processed_context, decoding)
+            else:
+                # Odpowiedź wstępna i jej dopracowanie w potoku dwóch kolejek
+                initial_answer, refined_answer = self.generate_refined_answer(question, processed_context, decoding)
+            if not any(text and text.startswith("An error occurred") for text in (initial_answer, refined_answer)):  # Błędów żadnego etapu nie zapamiętujemy
+                self.answer_cache.put(item_type, question, (initial_answer, refined_answer), (mode, decoding))
+
+        # End timing
+        end_time = time.time()  # Zakończenie pomiaru czasu
+        duration = end_time - start_time  # Oblicz czas trwania
+
+        # Rejestruj upływający czas
+        logger.info("Answer generated", extra=fields(backend=self.name, mode=mode, decoding=decoding, seconds=round(duration, 3), cached=cached is not None))  # Logowanie czasu generowania odpowiedzi
+
+        return {
+            "response": refined_answer,  # Zwrócenie dopracowanej odpowiedzi
+            "initialResponse": initial_answer,  # Zwrócenie wstępnej odpowiedzi
+            "contextSnippet": processed_context[:200] + "...",  # Fragment kontekstu dla debugowania
+            "timeTaken": float(duration),  # Upewnij się, że czas trwania jest liczbą zmiennoprzecinkową
+            "mode": mode,  # Użyty tryb generowania
+            "decoding": decoding,  # Użyty profil dekodowania
+            "cached": cached is not None  # Czy odpowiedź pochodzi z pamięci podręcznej
+        }
+
+    def _answer_single(self, item_type, question, processed_context, decoding):
+        cached = self.answer_cache.get(item_type, question, (None, decoding))  # Sprawdzenie pamięci odpowiedzi
+        if cached is not None:
+            answer = cached
+        else:
+            answer = self.generate_answer(question, processed_context, decoding)  # Generowanie odpowiedzi
+            if not answer.startswith("An error occurred"):  # Błędów nie zapamiętujemy
+                self.answer_cache.put(item_type, question, answer, (None, decoding))
+
+        return {
+            "response": answer,  # Zwrócenie odpowiedzi
+            "contextSnippet": processed_context[:200] + "...",  # Fragment kontekstu dla debugowania
+            "decoding": decoding,  # Użyty profil dekodowania
+            "cached": cached is not None  # Czy odpowiedź pochodzi z pamięci podręcznej
+        }
+
+
+    def _stream(self, item_type, question, item, options):
+        mode = self.resolve_mode(options) if self.two_stage else None  # Błędny tryb zgłaszany przed startem strumienia
+        decoding = self.resolve_decoding(options)
+        if decoding == "beam":
+            decoding = "greedy"  # Przeszukiwania wiązkowego nie da się strumieniować token po tokenie
+        return self._stream_answer(item_type, question, item.text, mode, decoding)
+
+    def _stream_answer(self, item_type, question, processed_context, mode, decoding):
+        """
+        Strumieniuje odpowiedź token po tokenie. W trybach quality i hybrid odpowiedź wstępna
+        (lub fragment z modelu qa) powstaje zwykłą ścieżką, a strumieniowany jest etap dopracowania.
+        """
+        start_time = time.time()
+        cached = self.answer_cache.get(item_type, question, (mode, decoding))  # Sprawdzenie pamięci odpowiedzi
+        initial_answer = None
+        if cached is not None:
+            answer = cached[1] if self.two_stage else cached
+            yield "token", {"text": answer}
+        else:
+            if mode in ("quality", "hybrid"):
+                initial_answer = self.extract_span(item_type, question) if mode == "hybrid" else None  # Fragment z modelu qa
+                if initial_answer is not None:
+                    initial_answer = format_span(initial_answer)
+                else:
+                    initial_answer = self.generate_answer(question, processed_context, decoding)  # Generowanie wstępnej odpowiedzi
+                prompt = self.refine_prompt(question, initial_answer)
+                kwargs = self.generation_kwargs(decoding, 0.8, SENTENCE_MAX_NEW_TOKENS)
+                formatter = IncrementalFormatter(lambda text: format_sentence(text, capitalize=False))
+            elif mode == "fast":
+                prompt = self.single_pass_prompt(question, processed_context)
+                kwargs = self.generation_kwargs(decoding, 0.7, SENTENCE_MAX_NEW_TOKENS)
+                formatter = IncrementalFormatter(format_sentence)
+            else:
+                prompt = self.answer_prompt(question, processed_context)
+                kwargs = self.generation_kwargs(decoding, 0.7, ANSWER_MAX_NEW_TOKENS)
+                formatter = IncrementalFormatter(format_answer, hold=hold_answer_intro)
+
+            try:
+                stream_model = self.refine_seq2seq if mode in ("quality", "hybrid") else self.seq2seq  # Strumieniowany jest etap dopracowania
+                chunks = stream_model.stream(prompt, **kwargs)
+                try:
+                    for chunk in chunks:
+                        text = formatter.feed(chunk)
+                        if text:
+                            yield "token", {"text": text}
+                finally:
+                    chunks.close()  # Przerwany strumień zatrzymuje generowanie
+                text = formatter.finish()
+                if text:
+                    yield "token", {"text": text}
+            except Exception:
+                logger.exception("Streaming generation error", extra=fields(backend=self.name))  # Logowanie błędu podczas generowania odpowiedzi
+                yield "error", {"error": "An error occurred while generating the answer."}
+                return
+
+            answer = formatter.result
+            if not any(text and text.startswith("An error occurred") for text in (initial_answer, answer)):  # Błędów nie zapamiętujemy
+                self.answer_cache.put(item_type, question, (initial_answer, answer) if self.two_stage else answer, (mode, decoding))
+
+        result = {
+            "response": answer,
+            "contextSnippet": processed_context[:200] + "...",  # Fragment kontekstu dla debugowania
+            "decoding": decoding,  # Użyty profil dekodowania
+            "cached": cached is not None  # Czy odpowiedź pochodzi z pamięci podręcznej
+        }
+        if self.two_stage:
+            result.update({
+                "initialResponse": cached[0] if cached is not None else initial_answer,
+                "timeTaken": float(time.time() - start_time),
+                "mode": mode
+            })
+        yield "done", result
+
+
+# Rejestr dostępnych backendów: nazwa -> (klasa, nazwa modelu, dodatkowe argumenty)
+BACKENDS = {
+    "qa": (QABackend, "deepset/roberta-base-squad2", {}),
+    "summarization": (SummarizationBackend, "facebook/bart-large-cnn", {}),
+    "text2text-v1": (Text2TextBackend, "google/flan-t5-base", {"two_stage": False}),  # Krótkie odpowiedzi
+    "text2text-v2": (Text2TextBackend, "google/flan-t5-base", {"two_stage": True}),  # Pełne zdania, mniejszy model
+    "text2text-v3": (Text2TextBackend, "google/flan-t5-large", {"two_stage": True}),  # Pełne zdania, większy model
+}
+
+
+def create_backend(name, item_store, quantize=None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+    backend_class, model_name, kwargs = BACKENDS[name]
+    return backend_class(name, model_name, item_store, quantize=quantize, **kwargs)
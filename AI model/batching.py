@@ -0,0 +1,181 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+# Domyślna konfiguracja mikro-batchowania (można nadpisać zmiennymi środowiskowymi)
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 8))  # Maksymalna liczba promptów w jednym wywołaniu modelu
+MAX_BATCH_WAIT_MS = float(os.environ.get("MAX_BATCH_WAIT_MS", 10))  # Maksymalny czas oczekiwania na kolejne prompty
+
+# Szybkie tokenizery (Rust) nie mogą być używane jednocześnie z różnymi ustawieniami
+# wyrównania/skracania z wielu wątków ("Already borrowed"), więc wywołania są serializowane
+TOKENIZER_LOCK = threading.RLock()
+
+
+class MicroBatcher:
+    """
+    Kolejka żądań przed modelem. Zbiera oczekujące elementy przez kilka milisekund
+    (lub do osiągnięcia max_batch_size), przetwarza je jednym wywołaniem process_fn
+    i rozsyła wyniki z powrotem do oczekujących wątków.
+    """
+
+    def __init__(self, process_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS, name="batcher"):
+        self.process_fn = process_fn  # Funkcja: lista elementów -> lista wyników (ta sama kolejność)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def _ensure_worker(self):
+        # Wątek startuje leniwie, aby batcher działał także po fork() procesu
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                if self._worker_pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, item, key=None):
+        """Dodaje element do kolejki i zwraca Future z wynikiem. Elementy o różnych kluczach nie trafiają do jednego batcha."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((key, item, future))
+        return future
+
+    def __call__(self, item, key=None):
+        return self.submit(item, key).result()  # Blokujące wywołanie dla pojedynczego elementu
+
+    def queue_depth(self):
+        return self._queue.qsize()  # Elementy czekające na batch
+
+    def _collect(self):
+        pending = [self._queue.get()]  # Czekanie na pierwszy element
+        deadline = time.monotonic() + self.max_wait
+        while len(pending) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+
+            # Grupowanie po kluczu (np. różne parametry generowania)
+            groups = {}
+            for key, item, future in pending:
+                groups.setdefault(key, []).append((item, future))
+
+            for entries in groups.values():
+                # Anulowane Future (wywołujący zrezygnował) są pomijane; pozostałe nie dadzą się już anulować
+                entries = [(item, future) for item, future in entries if future.set_running_or_notify_cancel()]
+                if not entries:
+                    continue
+                items = [item for item, _ in entries]
+                try:
+                    results = self.process_fn(items)
+                    for (_, future), result in zip(entries, results):
+                        future.set_result(result)
+                except Exception as e:
+                    for _, future in entries:
+                        future.set_exception(e)
+
+
+def generate_batch(model, tokenizer, prompts, device="cpu", encoder_cache=None, timings=None, **generate_kwargs):
+    """
+    Generuje odpowiedzi dla listy promptów jednym, wyrównanym (padding) wywołaniem model.generate.
+    Jeśli podano encoder_cache, prompty mają postać (prefiks, sufiks), a wejścia buduje pamięć enkodera.
+    Jeśli podano słownik timings, trafiają do niego czasy kroków: tokenization, encoder, decoding, detokenization.
+    """
+    clean_up = generate_kwargs.pop("clean_up_tokenization_spaces", True)
+    timings = timings if timings is not None else {}
+    start_time = time.perf_counter()
+    if encoder_cache is not None:
+        model_inputs = encoder_cache.build_inputs(prompts)
+    else:
+        with TOKENIZER_LOCK:
+            inputs = tokenizer(prompts, padding=True, return_tensors="pt").to(device)  # Tokenizacja z wyrównaniem długości
+        model_inputs = {
+            "input_ids": inputs["input_ids"],
+            "attention_mask": inputs["attention_mask"]  # Maska pomija tokeny wyrównujące
+        }
+    timings["tokenization"] = time.perf_counter() - start_time
+
+    with torch.no_grad():
+        if "encoder_outputs" not in model_inputs:
+            # Enkoder uruchamiany osobno (wynik identyczny), aby zmierzyć jego czas niezależnie od dekodowania
+            start_time = time.perf_counter()
+            model_inputs["encoder_outputs"] = model.get_encoder()(
+                input_ids=model_inputs.pop("input_ids"), attention_mask=model_inputs["attention_mask"]
+            )
+            timings["encoder"] = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        outputs = model.generate(**model_inputs, **generate_kwargs)
+        timings["decoding"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    texts = tokenizer.batch_decode(outputs, skip_special_tokens=True, clean_up_tokenization_spaces=clean_up)
+    timings["detokenization"] = time.perf_counter() - start_time
+    return texts
+
+
+class StopEvent(StoppingCriteria):
+    """Przerywa generowanie po ustawieniu zdarzenia (np. gdy klient zamknął połączenie)."""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.event.is_set()
+
+
+def stream_generate(model, tokenizer, prompt, device="cpu", encoder_cache=None, **generate_kwargs):
+    """
+    Generuje odpowiedź dla jednego promptu (poza kolejką batchującą) i zwraca kolejne
+    fragmenty tekstu w miarę dekodowania tokenów. model.generate działa w osobnym wątku,
+    który kończy pracę po następnym tokenie, gdy iterator zostanie zamknięty przed końcem.
+    """
+    clean_up = generate_kwargs.pop("clean_up_tokenization_spaces", True)
+    if encoder_cache is not None:
+        model_inputs = encoder_cache.build_inputs([prompt])
+    else:
+        with TOKENIZER_LOCK:
+            inputs = tokenizer(prompt, return_tensors="pt").to(device)
+        model_inputs = {"input_ids": inputs["input_ids"], "attention_mask": inputs["attention_mask"]}
+
+    streamer = TextIteratorStreamer(tokenizer, skip_special_tokens=True, clean_up_tokenization_spaces=clean_up)
+    stop = threading.Event()
+    errors = []
+
+    def run():
+        try:
+            with torch.no_grad():
+                model.generate(**model_inputs, streamer=streamer,
+                               stopping_criteria=StoppingCriteriaList([StopEvent(stop)]), **generate_kwargs)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()  # Odblokowanie czytelnika strumienia
+
+    thread = threading.Thread(target=run, name="stream-generate", daemon=True)
+    thread.start()
+    try:
+        for text in streamer:
+            if text:
+                yield text
+    finally:
+        stop.set()  # Zamknięty iterator (rozłączony klient) zatrzymuje generowanie
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,72 @@
+"""
+Budowa katalogu przedmiotów (items/catalog.jsonl) z plików tekstowych w katalogu items/.
+
+Każdy plik <nazwa>.txt staje się przedmiotem o identyfikatorze <nazwa> bez podkreśleń
+(diamond_pickaxe.txt -> diamondpickaxe) z nazwą alternatywną "diamond pickaxe".
+Przedmioty już obecne w katalogu (np. dodane przez POST /items) są zachowywane,
+a plik katalogu jest przepisywany bez zastąpionych wersji. Dla każdego modelu
+z BACKENDS zapisywana jest liczba tokenów opisu.
+
+Przykład:
+    python build_catalog.py
+    python build_catalog.py --aliases pickaxe=diamondpickaxe --no-tokens
+"""
+import argparse
+import glob
+import os
+
+from backends import BACKENDS
+from catalog import CATALOG_PATH, ITEMS_DIR, CatalogEntry, ItemCatalog, count_tokens, normalize_item_id
+from weights import load_tokenizer
+
+
+def load_tokenizers():
+    tokenizers = {}
+    for _, model_name, _ in BACKENDS.values():
+        if model_name in tokenizers:
+            continue
+        try:
+            tokenizers[model_name] = load_tokenizer(model_name)
+        except OSError as e:
+            print(f"{model_name}: tokenizer unavailable, skipping token counts ({e})")
+    return tokenizers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the item catalog from text files")
+    parser.add_argument("--items-dir", default=ITEMS_DIR)
+    parser.add_argument("--output", default=CATALOG_PATH)
+    parser.add_argument("--aliases", default="", help="Extra aliases: alias=itemId,alias=itemId")
+    parser.add_argument("--no-tokens", action="store_true", help="Skip token counts (no tokenizer download)")
+    args = parser.parse_args()
+
+    catalog = ItemCatalog(args.output)
+    catalog.load()
+    extra_aliases = {}
+    for pair in args.aliases.split(","):
+        if pair:
+            alias, item_id = pair.split("=")
+            extra_aliases.setdefault(normalize_item_id(item_id), []).append(alias)
+
+    entries = {entry.id: entry for entry in catalog.entries()}
+    for path in sorted(glob.glob(os.path.join(args.items_dir, "*.txt"))):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        item_id = normalize_item_id(stem)
+        previous = entries.get(item_id)
+        aliases = list(dict.fromkeys((previous.aliases if previous else []) + [stem.replace("_", " ")]))
+        entries[item_id] = CatalogEntry(item_id, text, aliases)
+
+    tokenizers = {} if args.no_tokens else load_tokenizers()
+    catalog = ItemCatalog(args.output)  # Pusty katalog zapisywany od nowa
+    for item_id, entry in entries.items():
+        entry.aliases = list(dict.fromkeys(entry.aliases + extra_aliases.get(item_id, [])))
+        entry.tokens = {**entry.tokens, **count_tokens(entry.text, tokenizers)}
+        catalog.add(entry, persist=False)
+    catalog.save()
+    print(f"{len(catalog)} items written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
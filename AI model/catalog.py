@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+ITEMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "items")  # Katalog z opisami przedmiotów
+CATALOG_PATH = os.environ.get("CATALOG_PATH", os.path.join(ITEMS_DIR, "catalog.jsonl"))  # Plik katalogu przedmiotów
+
+
+def normalize_item_id(name):
+    # "Diamond Pickaxe", "diamond_pickaxe" i "diamondpickaxe" wskazują ten sam przedmiot
+    return re.sub(r"[\W_]+", "", name.lower())
+
+
+def count_tokens(text, tokenizers):
+    """Liczba tokenów opisu dla każdego tokenizera: {nazwa modelu: liczba}."""
+    return {name: len(tokenizer.encode(text)) for name, tokenizer in tokenizers.items()}
+
+
+@dataclass
+class CatalogEntry:
+    """Przedmiot w katalogu: identyfikator, nazwy alternatywne, opis i liczby tokenów (tokenizer -> liczba)."""
+
+    id: str
+    text: str
+    aliases: list = field(default_factory=list)
+    tokens: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        return {"id": self.id, "aliases": self.aliases, "text": self.text, "tokens": self.tokens}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(normalize_item_id(data["id"]), data["text"], list(data.get("aliases", [])), dict(data.get("tokens", {})))
+
+
+class ItemCatalog:
+    """
+    Katalog przedmiotów wczytywany (load) raz z pliku JSON Lines (jeden przedmiot w linii)
+    do pamięci, z indeksem identyfikatorów i nazw alternatywnych. Nowe przedmioty dopisywane są na końcu
+    pliku (add), bez przepisywania katalogu; przy wczytywaniu późniejszy wpis o tym samym
+    identyfikatorze zastępuje wcześniejszy.
+    """
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self._entries = {}  # identyfikator -> CatalogEntry
+        self._aliases = {}  # znormalizowana nazwa -> identyfikator
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Wczytuje katalog z dysku. Zwraca liczbę przedmiotów."""
+        entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = CatalogEntry.from_dict(json.loads(line))
+                        entries[entry.id] = entry
+        aliases = {item_id: item_id for item_id in entries}
+        for item_id, entry in entries.items():
+            for name in self._names(entry):
+                aliases.setdefault(name, item_id)  # Identyfikator ma pierwszeństwo przed nazwą innego przedmiotu
+        with self._lock:
+            self._entries = entries
+            self._aliases = aliases
+        return len(entries)
+
+    def add(self, entry, persist=True):
+        """
+        Dodaje lub zastępuje przedmiot (także w pliku, jeśli persist). Zwraca True, jeśli zastąpiono
+        istniejący. Rzuca ValueError, gdy nazwa jest już używana przez inny przedmiot.
+        """
+        with self._lock:
+            for name in self._names(entry):
+                owner = self._aliases.get(name)
+                if owner is not None and owner != entry.id:
+                    raise ValueError(f"Name '{name}' is already used by item '{owner}'")
+            replaced = entry.id in self._entries
+            if persist:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+            if replaced:
+                for name in self._names(self._entries[entry.id]):
+                    self._aliases.pop(name, None)  # Nazwy poprzedniej wersji przestają obowiązywać
+            self._entries[entry.id] = entry
+            for name in self._names(entry):
+                self._aliases[name] = entry.id
+        return replaced
+
+    def save(self):
+        """Przepisuje plik katalogu (po jednym wpisie na przedmiot, bez zastąpionych wersji)."""
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                for entry in self._entries.values():
+                    file.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)  # Atomowo - działający serwer nie zobaczy niepełnego pliku
+
+    def stamp(self):
+        """Znacznik wersji pliku (czas modyfikacji, rozmiar) albo None, jeśli plik nie istnieje."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def resolve(self, name):
+        """Identyfikator przedmiotu dla identyfikatora lub nazwy alternatywnej albo None."""
+        return self._aliases.get(normalize_item_id(name))
+
+    def get(self, item_id):
+        return self._entries.get(item_id)
+
+    def entries(self):
+        return list(self._entries.values())
+
+    def texts(self):
+        return {item_id: entry.text for item_id, entry in self._entries.items()}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _names(entry):
+        return {entry.id} | {normalize_item_id(alias) for alias in entry.aliases}
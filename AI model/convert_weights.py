@@ -0,0 +1,39 @@
+"""
+Jednorazowa konwersja wag modeli do lokalnych plików safetensors (katalog WEIGHTS_DIR).
+
+Serwer wczytuje potem wagi przez odwzorowanie pliku w pamięci (mmap) zamiast
+from_pretrained, więc start trwa krócej, a procesy robocze współdzielą strony z wagami.
+
+Przykład:
+    python convert_weights.py                     # wszystkie modele z BACKENDS
+    python convert_weights.py --backends qa,text2text-v2
+"""
+import argparse
+
+from backends import BACKENDS
+from weights import WEIGHTS_DIR, convert, has_local_weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert model weights to a local safetensors cache")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backend names")
+    parser.add_argument("--dir", default=WEIGHTS_DIR, help="Output directory")
+    parser.add_argument("--force", action="store_true", help="Convert again even if local weights exist")
+    args = parser.parse_args()
+
+    models = {}
+    for name in args.backends.split(","):
+        if name:
+            backend_class, model_name, _ = BACKENDS[name]
+            models[model_name] = backend_class.MODEL_CLASS  # Backendy tego samego modelu konwertowane raz
+
+    for model_name, model_class in models.items():
+        if has_local_weights(model_name, args.dir) and not args.force:
+            print(f"{model_name}: already converted")
+            continue
+        path = convert(model_class, model_name, args.dir)
+        print(f"{model_name}: {path}")
+
+
+if __name__ == '__main__':
+    main()
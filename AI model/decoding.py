@@ -0,0 +1,34 @@
+import os
+
+# Profil dekodowania modeli FLAN-T5 (można nadpisać zmienną środowiskową lub polem "decoding" w zapytaniu):
+#   "greedy"   - zawsze najbardziej prawdopodobny token; najszybszy i deterministyczny
+#                (te same pytania dają te same odpowiedzi, więc pamięć odpowiedzi jest spójna z modelem),
+#   "beam"     - przeszukiwanie wiązkowe z BEAM_SIZE hipotezami, zakończone, gdy wszystkie dojdą do końca zdania;
+#                deterministyczne, zwykle pełniejsze odpowiedzi kosztem dłuższego dekodowania,
+#   "sampling" - losowanie (top-k, top-p, temperatura); odpowiedzi różnią się między wywołaniami.
+DECODING = os.environ.get("DECODING", "greedy")
+DECODING_PROFILES = ("greedy", "beam", "sampling")
+BEAM_SIZE = int(os.environ.get("BEAM_SIZE", 3))  # Liczba hipotez w profilu beam
+
+# Limity nowych tokenów dopasowane do długości odpowiedzi (koniec wcześniej po tokenie końca tekstu)
+ANSWER_MAX_NEW_TOKENS = int(os.environ.get("ANSWER_MAX_NEW_TOKENS", 32))  # Krótka odpowiedź (kilka słów)
+SENTENCE_MAX_NEW_TOKENS = int(os.environ.get("SENTENCE_MAX_NEW_TOKENS", 64))  # Odpowiedź w jednym pełnym zdaniu
+
+
+def decoding_kwargs(profile, temperature, max_new_tokens):
+    """Parametry model.generate dla profilu dekodowania (temperatura dotyczy tylko próbkowania)."""
+    if profile not in DECODING_PROFILES:
+        raise ValueError(f"Unknown decoding profile: {profile}")
+    kwargs = {"max_new_tokens": max_new_tokens}
+    if profile == "greedy":
+        kwargs.update(do_sample=False, num_beams=1)
+    elif profile == "beam":
+        kwargs.update(do_sample=False, num_beams=BEAM_SIZE, early_stopping=True)  # Koniec, gdy BEAM_SIZE hipotez jest gotowych
+    else:
+        kwargs.update(
+            do_sample=True,  # Włączenie próbkowania
+            temperature=temperature,  # Parametr kontrolujący losowość odpowiedzi
+            top_k=30,  # Ograniczenie do 30 najlepszych tokenów
+            top_p=0.9  # Ograniczenie do tokenów o łącznym prawdopodobieństwie 90%
+        )
+    return kwargs
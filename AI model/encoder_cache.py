@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+
+from batching import TOKENIZER_LOCK
+
+# Tryb pamięci podręcznej enkodera:
+#   "off"    - cały prompt tokenizowany i kodowany przy każdym zapytaniu,
+#   "tokens" - tokeny stałego prefiksu (instrukcja + kontekst przedmiotu) są zapamiętywane,
+#              enkoder nadal widzi cały prompt (wynik identyczny jak bez pamięci),
+#   "hidden" - zapamiętywane są także stany ukryte enkodera dla prefiksu; przy zapytaniu
+#              kodowana jest tylko część zależna od pytania (prefiks nie "widzi" pytania
+#              w enkoderze, więc odpowiedzi mogą się nieznacznie różnić).
+ENCODER_CACHE_MODE = os.environ.get("ENCODER_CACHE_MODE", "tokens")
+ENCODER_CACHE_SIZE = int(os.environ.get("ENCODER_CACHE_SIZE", 64))  # Maksymalna liczba zapamiętanych prefiksów (LRU)
+
+
+class LRUCache:
+    """Prosty, bezpieczny wątkowo słownik LRU o ograniczonej liczbie wpisów."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)  # Usunięcie najdawniej używanego wpisu
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class EncoderCache:
+    """
+    Buduje wejścia modelu T5 dla promptów w postaci (prefiks, sufiks), gdzie prefiks
+    (instrukcja + kontekst przedmiotu) powtarza się między zapytaniami, a sufiks zawiera pytanie.
+    """
+
+    def __init__(self, model, tokenizer, device="cpu", mode=ENCODER_CACHE_MODE, max_entries=ENCODER_CACHE_SIZE):
+        if mode not in ("off", "tokens", "hidden"):
+            raise ValueError(f"Unknown encoder cache mode: {mode}")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.mode = mode
+        self.token_cache = LRUCache(max_entries)
+        self.state_cache = LRUCache(max_entries)
+
+    def clear(self):
+        # Wywoływane po przeładowaniu opisów przedmiotów
+        self.token_cache.clear()
+        self.state_cache.clear()
+
+    def prefix_ids(self, prefix):
+        ids = self.token_cache.get(prefix)
+        if ids is None:
+            with TOKENIZER_LOCK:
+                ids = self.tokenizer(prefix, add_special_tokens=False)["input_ids"]  # Bez tokenu końca sekwencji
+            self.token_cache.put(prefix, ids)
+        return ids
+
+    def prefix_states(self, prefix):
+        states = self.state_cache.get(prefix)
+        if states is None:
+            ids = torch.tensor([self.prefix_ids(prefix)], device=self.device)
+            with torch.no_grad():
+                states = self.model.get_encoder()(input_ids=ids).last_hidden_state[0]
+            self.state_cache.put(prefix, states)
+        return states
+
+    def build_inputs(self, prompts):
+        """Zwraca argumenty dla model.generate dla listy promptów (prefiks, sufiks)."""
+        if self.mode == "off":
+            with TOKENIZER_LOCK:
+                inputs = self.tokenizer(["".join(p) for p in prompts], padding=True, return_tensors="pt").to(self.device)
+            return {"input_ids": inputs["input_ids"], "attention_mask": inputs["attention_mask"]}
+
+        with TOKENIZER_LOCK:
+            suffix_ids = self.tokenizer([suffix for _, suffix in prompts])["input_ids"]  # Sufiks kończy się tokenem </s>
+        if self.mode == "tokens":
+            rows = [self.prefix_ids(prefix) + ids for (prefix, _), ids in zip(prompts, suffix_ids)]
+            return self._pad_ids(rows)
+
+        # Tryb "hidden": kodowanie samych sufiksów jednym batchem i sklejenie ze stanami prefiksów
+        suffix_inputs = self._pad_ids(suffix_ids)
+        with torch.no_grad():
+            suffix_states = self.model.get_encoder()(**suffix_inputs).last_hidden_state
+        rows = []
+        for i, (prefix, _) in enumerate(prompts):
+            rows.append(torch.cat([self.prefix_states(prefix), suffix_states[i, :len(suffix_ids[i])]], dim=0))
+
+        max_len = max(row.shape[0] for row in rows)
+        hidden = rows[0].new_zeros((len(rows), max_len, rows[0].shape[-1]))
+        attention_mask = torch.zeros((len(rows), max_len), dtype=torch.long, device=self.device)
+        for i, row in enumerate(rows):
+            hidden[i, :row.shape[0]] = row
+            attention_mask[i, :row.shape[0]] = 1
+        return {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden), "attention_mask": attention_mask}
+
+    def _pad_ids(self, rows):
+        max_len = max(len(row) for row in rows)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = torch.full((len(rows), max_len), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), max_len), dtype=torch.long)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[i, :len(row)] = 1
+        return {"input_ids": input_ids.to(self.device), "attention_mask": attention_mask.to(self.device)}
@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+# Konfiguracja wykonawcy inferencji (można nadpisać zmiennymi środowiskowymi)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0)) or max(1, torch.get_num_threads())  # Wątki inferencji (domyślnie budżet wątków PyTorch)
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", 32))  # Maksymalna liczba zadań oczekujących na wolny wątek
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 30))  # Limit czasu odpowiedzi w sekundach
+STREAM_WORKERS = int(os.environ.get("STREAM_WORKERS", 0)) or INFERENCE_WORKERS  # Maksymalna liczba jednoczesnych strumieni (/generate/stream)
+
+
+class QueueFullError(Exception):
+    """Kolejka zadań jest pełna - zapytanie należy odrzucić (503)."""
+
+
+class InferenceExecutor:
+    """
+    Ograniczona pula wątków wykonująca wywołania modeli poza pętlą zdarzeń.
+    Gdy liczba zadań w toku przekracza pulę i kolejkę, nowe zadania są od razu odrzucane.
+    Strumienie generowane poza pulą zajmują miejsce w tym samym limicie zadań w toku.
+    """
+
+    def __init__(self, max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE, max_streams=STREAM_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = self.max_workers + max(0, int(max_queue))
+        self.max_streams = max(1, int(max_streams))
+        self._streams = 0
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def submit(self, fn, *args):
+        """Zleca zadanie i zwraca concurrent.futures.Future; rzuca QueueFullError przy przeciążeniu."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError("Inference queue is full")
+            self._pending += 1
+        future = self._pool.submit(contextvars.copy_context().run, fn, *args)  # Z identyfikatorem zapytania (logi)
+        future.add_done_callback(self._done)  # Zadanie zwalnia miejsce dopiero po zakończeniu, także po przekroczeniu czasu
+        return future
+
+    def open_stream(self):
+        """
+        Rezerwuje miejsce dla jednego strumienia i zwraca funkcję, która je zwalnia
+        (można ją wywołać wielokrotnie); rzuca QueueFullError przy przeciążeniu.
+        """
+        with self._lock:
+            if self._streams >= self.max_streams or self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError("Inference queue is full")
+            self._streams += 1
+            self._pending += 1
+        released = []
+
+        def release():
+            with self._lock:
+                if released:
+                    return
+                released.append(True)
+                self._streams -= 1
+                self._pending -= 1
+        return release
+
+    async def run(self, fn, *args, timeout=REQUEST_TIMEOUT):
+        """Asynchronicznie czeka na wynik zadania; rzuca asyncio.TimeoutError po przekroczeniu limitu."""
+        future = asyncio.wrap_future(self.submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "maxPending": self.max_pending,
+                "pending": self._pending,
+                "maxStreams": self.max_streams,
+                "streams": self._streams,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
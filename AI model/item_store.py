@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from batching import TOKENIZER_LOCK
+from catalog import ItemCatalog
+
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", 2))  # Co ile sekund sprawdzać zmiany pliku katalogu (0 = przy każdym zapytaniu)
+
+# Kontekst przygotowany dla konkretnego modelu: tekst po skróceniu i identyfikatory tokenów
+PreparedContext = namedtuple("PreparedContext", ["text", "token_ids"])
+
+
+class ItemStore:
+    """
+    Magazyn opisów przedmiotów budowany raz przy starcie serwera z katalogu przedmiotów.
+    Przechowuje surowy tekst każdego przedmiotu oraz, dla każdego zarejestrowanego widoku
+    (tokenizera modelu), skrócony tekst i tablicę tokenów, dzięki czemu obsługa zapytania
+    nie czyta plików ani nie tokenizuje kontekstu ponownie. Przedmioty można dodawać
+    w trakcie działania (add_item). Plik katalogu jest wspólny dla procesów roboczych:
+    refresh() przeładowuje magazyn, gdy plik zmienił inny proces (/reload, POST /items).
+    """
+
+    def __init__(self, catalog=None, retrieval=None):
+        self.catalog = catalog if catalog is not None else ItemCatalog()
+        self.retrieval = retrieval  # Opcjonalny indeks fragmentów (RetrievalIndex)
+        self._views = {}  # nazwa widoku -> funkcja przygotowująca (tekst -> (tekst, tokeny))
+        self._texts = {}  # typ przedmiotu -> surowy tekst
+        self._prepared = {}  # (nazwa widoku, typ przedmiotu) -> PreparedContext
+        self._lock = threading.Lock()
+        self._listeners = []  # Funkcje wywoływane po przeładowaniu (np. czyszczenie pamięci odpowiedzi)
+        self._refresh_lock = threading.Lock()
+        self._catalog_stamp = None  # Wersja pliku katalogu odpowiadająca stanowi w pamięci
+        self._checked_at = 0.0
+        self.reload()
+
+    def add_reload_listener(self, fn):
+        """Rejestruje funkcję wywoływaną po każdym przeładowaniu katalogu."""
+        self._listeners.append(fn)
+
+    def add_view(self, name, preprocess_fn):
+        """
+        Rejestruje widok kontekstu i od razu przygotowuje go dla wszystkich przedmiotów.
+        Ponowna rejestracja tej samej nazwy (np. ten sam model w kilku backendach) jest pomijana.
+        """
+        with self._lock:
+            if name in self._views:
+                return
+            prepared = dict(self._prepared)
+            for item_type, text in self._texts.items():
+                with TOKENIZER_LOCK:
+                    prepared[(name, item_type)] = PreparedContext(*preprocess_fn(text))
+            self._prepared = prepared
+            self._views[name] = preprocess_fn
+
+    def reload(self):
+        """Ponownie wczytuje katalog z dysku i przelicza wszystkie widoki. Zwraca liczbę przedmiotów."""
+        stamp = self.catalog.stamp()  # Przed odczytem: zapis w trakcie wczytywania wywoła kolejne przeładowanie
+        self.catalog.load()
+        texts = self.catalog.texts()
+
+        if self.retrieval is not None:
+            self.retrieval.rebuild(texts)  # Indeksy fragmentów (wczytywane z dysku, jeśli treść się nie zmieniła)
+
+        with self._lock:
+            prepared = {}
+            for name, preprocess_fn in self._views.items():
+                for item_type, text in texts.items():
+                    with TOKENIZER_LOCK:
+                        prepared[(name, item_type)] = PreparedContext(*preprocess_fn(text))
+            # Podmiana całych słowników, aby równoległe zapytania widziały spójny stan
+            self._texts = texts
+            self._prepared = prepared
+            self._catalog_stamp = stamp
+        for fn in self._listeners:
+            fn()
+        return len(texts)
+
+    def refresh(self, force=False):
+        """
+        Przeładowuje magazyn, jeśli plik katalogu zmienił się od ostatniego wczytania
+        (np. w innym procesie roboczym). Bez force plik sprawdzany jest najwyżej co
+        CATALOG_CHECK_INTERVAL sekund. Zwraca True, jeśli przeładowano.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < CATALOG_CHECK_INTERVAL:
+            return False
+        with self._refresh_lock:
+            self._checked_at = now
+            if self.catalog.stamp() == self._catalog_stamp:
+                return False
+            self.reload()
+            return True
+
+    def add_item(self, entry):
+        """
+        Dodaje (lub zastępuje) przedmiot bez przeładowania całego katalogu: zapis w katalogu,
+        przygotowanie wszystkich widoków i indeksu fragmentów tylko dla tego przedmiotu.
+        Zwraca True, jeśli zastąpiono istniejący przedmiot.
+        """
+        with self._lock:
+            prepared = {}
+            for name, preprocess_fn in self._views.items():
+                with TOKENIZER_LOCK:
+                    prepared[(name, entry.id)] = PreparedContext(*preprocess_fn(entry.text))
+            stamp = self.catalog.stamp()
+            replaced = self.catalog.add(entry)  # ValueError przy konflikcie nazw - nic nie zostaje zmienione
+            if stamp == self._catalog_stamp:
+                self._catalog_stamp = self.catalog.stamp()  # Własny dopisek nie wymaga przeładowania tego procesu
+            if self.retrieval is not None:
+                self.retrieval.add(entry.id, entry.text)
+            self._texts = {**self._texts, entry.id: entry.text}
+            self._prepared = {**self._prepared, **prepared}
+        return replaced
+
+    def resolve(self, item_type):
+        """
+        Identyfikator przedmiotu dla identyfikatora lub nazwy alternatywnej albo None.
+        Nieznana nazwa mogła zostać właśnie dodana w innym procesie, więc wtedy plik
+        katalogu sprawdzany jest od razu.
+        """
+        item_id = self.catalog.resolve(item_type)
+        if item_id is None and self.refresh(force=True):
+            item_id = self.catalog.resolve(item_type)
+        return item_id
+
+    def item_types(self):
+        return list(self._texts)
+
+    def get_text(self, item_type):
+        """Zwraca surowy opis przedmiotu lub None, jeśli typ jest nieznany."""
+        item_id = self.resolve(item_type)
+        return self._texts.get(item_id) if item_id else None
+
+    def get(self, item_type, view):
+        """Zwraca PreparedContext dla danego widoku lub None, jeśli typ jest nieznany."""
+        return self._prepared.get((view, self.resolve(item_type)))
+
+    def retrieve(self, item_type, view, question):
+        """
+        Zwraca PreparedContext złożony tylko z fragmentów opisu pasujących do pytania
+        (wymaga indeksu fragmentów) lub None, jeśli typ jest nieznany.
+        """
+        item_id = self.resolve(item_type)
+        text = self.retrieval.retrieve(item_id, question) if item_id else None
+        if text is None:
+            return None
+        with TOKENIZER_LOCK:
+            return PreparedContext(*self._views[view](text))
@@ -0,0 +1,132 @@
+"""
+Logowanie serwera: poziomy (LOG_LEVEL), rekordy w formacie JSON (LOG_FORMAT=json) lub tekstowym
+i nieblokujący zapis - wątek obsługujący zapytanie tylko wkłada rekord do kolejki, a zapis
+na standardowe wyjście wykonuje osobny wątek (QueueListener).
+
+Każdy rekord zawiera identyfikator bieżącego zapytania (requestId), a dodatkowe pola
+(np. czasy) przekazuje się przez extra=fields(...).
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # DEBUG włącza zrzuty promptów i odpowiedzi
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # json lub text
+LOGGER_NAME = "nai"
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_listener = None
+_setup_lock = threading.Lock()
+_exception_formatter = logging.Formatter()  # Ślad stosu formatowany przed przekazaniem rekordu do kolejki
+
+
+def set_request_id(request_id):
+    return _request_id.set(request_id)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def fields(**values):
+    """Dodatkowe pola rekordu: logger.info("...", extra=fields(backend="qa", seconds=0.12))."""
+    return {"fields": values}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.request_id:
+            entry["requestId"] = record.request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        extra = getattr(record, "fields", {})
+        if extra:
+            message += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return message
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, który nie wkleja śladu stosu do treści komunikatu (jak prepare() z biblioteki
+    standardowej). Wyjątek formatowany jest od razu do exc_text, bo obiekt traceback nie powinien
+    czekać w kolejce, a formatery odczytują go stamtąd jako osobne pole.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)  # Inne handlery mogą jeszcze korzystać z oryginału
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class RequestIdFilter(logging.Filter):
+    # Identyfikator zapytania odczytywany w wątku, który utworzył rekord (przed przekazaniem do kolejki)
+    def filter(self, record):
+        record.request_id = get_request_id()
+        return True
+
+
+def _start_listener(log_queue, handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def setup_logging(level=LOG_LEVEL, log_format=LOG_FORMAT):
+    """Konfiguruje logger "nai" (jednorazowo). Kolejne wywołania zmieniają tylko poziom."""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        handler = logging.StreamHandler(sys.stdout)
+        if log_format == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = StructuredQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+        _start_listener(log_queue, handler)
+        atexit.register(lambda: _listener.stop())  # Zapis rekordów pozostałych w kolejce
+
+        if hasattr(os, "register_at_fork"):
+            # Wątek zapisujący nie przeżywa fork() (gunicorn z preload) - proces potomny uruchamia własny
+            os.register_at_fork(after_in_child=lambda: _start_listener(log_queue, handler))
+    return logger
+
+
+def get_logger(name):
+    """Logger modułu, np. get_logger("backends") -> "nai.backends"."""
+    setup_logging()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
@@ -0,0 +1,184 @@
+"""
+Minimalny rejestr metryk w formacie tekstowym Prometheusa (bez zewnętrznych zależności):
+liczniki, wartości bieżące i histogramy z etykietami, udostępniane przez GET /metrics.
+Przy kilku procesach roboczych (serve.py) każdy proces ma własne metryki.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Sekundy
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """Zwraca listę (sufiks nazwy, wartości etykiet, dodatkowe etykiety, wartość)."""
+        with self._lock:
+            return [("", key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackMetric(Metric):
+    """Wartości odczytywane dopiero przy eksporcie: fn() -> {krotka etykiet: wartość}."""
+
+    def __init__(self, name, documentation, labelnames, fn, type_name="gauge", registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.fn = fn
+        self.type_name = type_name
+
+    def samples(self):
+        return [("", tuple(str(v) for v in key), (), value) for key, value in self.fn().items()]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Mierzy czas wykonania bloku with."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                for bound, count in zip(self.buckets, counts):
+                    samples.append(("_bucket", key, (("le", _format_value(bound)),), count))
+                samples.append(("_sum", key, (), total))
+                samples.append(("_count", key, (), counts[-1]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def memory_usage():
+    """
+    Zwraca zużycie pamięci bieżącego procesu w MB: RSS (wszystkie strony w pamięci),
+    PSS (strony współdzielone podzielone przez liczbę procesów) i część współdzieloną.
+    Linux: /proc/self/smaps_rollup.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as file:
+            for line in file:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Shared_Clean:", "Shared_Dirty:"):
+                    usage[parts[0][:-1]] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rssMb": round(usage.get("Rss", 0), 1),
+        "pssMb": round(usage.get("Pss", 0), 1),
+        "sharedMb": round(usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0), 1)
+    }
+
+
+def module_bytes(module):
+    """Rozmiar wag i buforów modelu w bajtach (także spakowanych wag int8 po kwantyzacji)."""
+    total = 0
+    for value in module.state_dict().values():
+        tensors = value if isinstance(value, (tuple, list)) else (value,)
+        for tensor in tensors:
+            if hasattr(tensor, "element_size"):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+# Metryki wspólne dla serwera, backendów i kolejek batchujących
+REQUESTS = Counter("nai_requests_total", "HTTP requests by endpoint and status code", ("endpoint", "status"))
+REQUEST_SECONDS = Histogram("nai_request_seconds", "HTTP request latency in seconds", ("endpoint",))
+STAGE_SECONDS = Histogram(
+    "nai_stage_seconds",
+    "Per-backend request stage latency in seconds (context_load, extraction, generation, refinement, postprocess)",
+    ("backend", "stage")
+)
+MODEL_STEP_SECONDS = Histogram(
+    "nai_model_step_seconds",
+    "Per-batch model step latency in seconds (tokenization, encoder, decoding, detokenization)",
+    ("model", "batcher", "step")
+)
+BATCH_SIZE = Histogram("nai_batch_size", "Prompts per model call", ("model", "batcher"), buckets=BATCH_SIZE_BUCKETS)
+HYBRID_ANSWERS = Counter("nai_hybrid_answers_total", "Hybrid mode answers by path (span, fallback)", ("backend", "path"))
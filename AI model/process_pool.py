@@ -0,0 +1,301 @@
+"""
+Pula procesów z replikami modeli (opcjonalna, REPLICAS > 0).
+
+Jedna instancja modelu w jednym procesie nie wykorzystuje wielu rdzeni przy małych
+batchach: wątki wewnątrz operacji PyTorch skalują się słabo dla batcha o rozmiarze jeden.
+Pula uruchamia REPLICAS procesów, każdy przypięty (sched_setaffinity) do osobnego zbioru
+rdzeni i z własną liczbą wątków PyTorch. Zadania trafiają do wspólnej kolejki; wolna
+replika pobiera zadanie, dobiera do niego czekające zadania o tym samym kluczu
+(mikro-batch) i odsyła wyniki. Replika, która zakończy się w trakcie pracy (np. OOM),
+nie jest uruchamiana ponownie: jej zadania kończą się błędem, a pula zgłasza niesprawność.
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+
+import torch
+
+from batching import MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS
+from logging_config import fields, get_logger
+
+# Konfiguracja puli replik (można nadpisać zmiennymi środowiskowymi)
+REPLICAS = int(os.environ.get("REPLICAS", 0))  # Liczba procesów z replikami modeli (0 = inferencja w procesie serwera)
+REPLICA_THREADS = int(os.environ.get("REPLICA_THREADS", 0))  # Wątki PyTorch na replikę (0 = liczba przypisanych rdzeni)
+REPLICA_START_TIMEOUT = float(os.environ.get("REPLICA_START_TIMEOUT", 600))  # Maksymalny czas ładowania modeli w replikach (sekundy)
+REPLICA_TASK_TIMEOUT = float(os.environ.get("REPLICA_TASK_TIMEOUT", 300))  # Maksymalny czas oczekiwania na wynik zadania (sekundy, 0 = bez limitu)
+logger = get_logger("process_pool")
+
+
+class ReplicaError(Exception):
+    """Błąd zadania zgłoszony przez replikę."""
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_sets(replicas, cores=None):
+    """Dzieli rdzenie na replicas rozłącznych, ciągłych zbiorów (przy braku rdzeni zbiory się powtarzają)."""
+    cores = cores if cores is not None else available_cores()
+    if replicas > len(cores):
+        return [[cores[i % len(cores)]] for i in range(replicas)]
+    size = len(cores) // replicas
+    return [cores[i * size:(i + 1) * size] for i in range(replicas - 1)] + [cores[(replicas - 1) * size:]]
+
+
+class ReplicaPool:
+    """
+    Procesy z replikami modeli za wspólną kolejką zadań. loader(spec) tworzy w replice obiekt
+    modelu dla opisu spec (krotki); zadanie wywołuje na nim metodę. Zadania z kluczem batcha
+    są łączone: metoda dostaje listę argumentów i zwraca listę wyników.
+    Procesy powstają przez fork(), więc pulę należy uruchomić przed startem wątków serwera.
+    """
+
+    def __init__(self, loader, replicas=REPLICAS, threads=REPLICA_THREADS, preload=(),
+                 max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        context = multiprocessing.get_context("fork")
+        self.replicas = max(1, int(replicas))
+        self.core_sets = core_sets(self.replicas)
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._futures = {}  # identyfikator zadania -> Future
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Semaphore(0)
+        self.completed = [0] * self.replicas
+        self.errors = {}  # numer repliki -> opis błędu (nieudane ładowanie lub zakończenie procesu)
+        self._running = [set() for _ in range(self.replicas)]  # Zadania pobrane przez każdą replikę
+        self._loaded = set()  # Repliki, które załadowały modele
+        self._processes = [
+            context.Process(
+                target=_replica_main, name=f"replica-{index}", daemon=True,
+                args=(index, cores, threads or len(cores), loader, list(preload), self._tasks, self._results,
+                      max(1, int(max_batch_size)), max(0.0, float(max_wait_ms)) / 1000.0, os.getpid())
+            )
+            for index, cores in enumerate(self.core_sets)
+        ]
+        for process in self._processes:
+            process.start()
+        threading.Thread(target=self._collect_results, name="replica-results", daemon=True).start()
+        logger.info("Replica pool started", extra=fields(replicas=self.replicas, cores=self.core_sets,
+                                                          pids=[process.pid for process in self._processes]))
+
+    def submit(self, spec, method, args=(), kwargs=None, batch_key=None):
+        """
+        Zleca wywołanie metody na replice modelu spec i zwraca Future. Bez klucza batcha
+        wywoływane jest method(*args, **kwargs), z kluczem - method([args, ...]) dla zadań
+        o tym samym kluczu pobranych razem.
+        """
+        future = Future()
+        with self._lock:
+            if len(self.errors) == self.replicas:
+                raise ReplicaError("No replica is available")  # Wszystkie repliki zakończyły się
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+        future.add_done_callback(lambda _: self._forget(task_id))  # Także po porzuceniu przez wywołującego (abandon)
+        self._tasks.put((task_id, spec, method, args, kwargs or {}, batch_key))
+        return future
+
+    def wait_ready(self, timeout=REPLICA_START_TIMEOUT):
+        """
+        Czeka, aż każda replika załaduje modele z preload. Zwraca False po przekroczeniu czasu,
+        rzuca ReplicaError, gdy któraś replika nie załadowała modeli.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        for _ in range(self.replicas):
+            if not self._ready.acquire(timeout=max(0.0, deadline - time.monotonic()) if deadline is not None else None):
+                return False
+            self._ready.release()  # Licznik zostaje dla kolejnych wywołań
+        if self.errors:
+            raise ReplicaError("; ".join(f"replica {index}: {error}" for index, error in sorted(self.errors.items())))
+        return True
+
+    @property
+    def healthy(self):
+        """False, jeśli któraś replika nie załadowała modeli lub zakończyła się."""
+        return not self.errors
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._futures)
+        return {
+            "replicas": self.replicas,
+            "cores": self.core_sets,
+            "alive": sum(1 for process in self._processes if process.is_alive()),
+            "pending": pending,
+            "completed": list(self.completed),
+            "errors": {str(index): error for index, error in self.errors.items()}
+        }
+
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+
+    def abandon(self, future):
+        """Anuluje zadanie tej puli, na którego wynik wywołujący już nie czeka. Zwraca False dla obcych Future."""
+        with self._lock:
+            if not any(pending is future for pending in self._futures.values()):
+                return False
+        future.cancel()  # Wynik repliki zostanie pominięty (_resolve)
+        return True
+
+    def _forget(self, task_id):
+        with self._lock:
+            self._futures.pop(task_id, None)
+
+    def _collect_results(self):
+        while True:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_replicas()  # Replika zakończona bez komunikatu (np. OOM killer, segfault)
+                continue
+            kind, index = message[0], message[1]
+            if kind == "ready":
+                self._loaded.add(index)
+                self._ready.release()
+            elif kind == "failed":
+                self._mark_failed(index, f"model loading failed: {message[2]}")
+            elif kind == "started":
+                with self._lock:
+                    self._running[index].update(message[2])
+            else:
+                _, index, task_id, ok, value = message
+                with self._lock:
+                    future = self._futures.pop(task_id, None)
+                    self._running[index].discard(task_id)
+                    self.completed[index] += 1
+                if future is not None:
+                    _resolve(future, value if ok else ReplicaError(value), ok)
+
+    def _check_replicas(self):
+        for index, process in enumerate(self._processes):
+            if index not in self.errors and not process.is_alive():
+                self._mark_failed(index, f"process exited with code {process.exitcode}")
+
+    def _mark_failed(self, index, error):
+        # Zadania pobrane przez replikę nie zostaną wykonane - kończą się błędem zamiast czekać bez końca
+        with self._lock:
+            self.errors[index] = error
+            lost = [self._futures.pop(task_id) for task_id in self._running[index] if task_id in self._futures]
+            self._running[index].clear()
+        logger.error("Replica failed", extra=fields(replica=index, error=error, lostTasks=len(lost)))
+        if index not in self._loaded:
+            self._ready.release()  # wait_ready zgłasza błąd zamiast czekać na tę replikę
+        for future in lost:
+            _resolve(future, ReplicaError(f"Replica {index} failed: {error}"), ok=False)
+
+
+def _resolve(future, value, ok):
+    try:
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+    except InvalidStateError:
+        pass  # Wywołujący zrezygnował z wyniku (przekroczony czas)
+
+
+def task_result(future, timeout=REPLICA_TASK_TIMEOUT):
+    """
+    Wynik zadania (Future z puli replik lub kolejki batchującej). Po przekroczeniu czasu
+    zgłaszany jest ReplicaError zamiast blokowania wątku zapytania; zadanie puli replik
+    jest anulowane, a element kolejki batchującej przetwarzany dalej razem z sąsiadami.
+    """
+    try:
+        return future.result(timeout=timeout or None)
+    except FutureTimeoutError:
+        if _pool is not None:
+            _pool.abandon(future)
+        raise ReplicaError(f"Task timed out after {timeout:g}s") from None
+
+
+def _replica_main(index, cores, threads, loader, preload, tasks, results, max_batch_size, max_wait, parent_pid):
+    # Proces repliki: własne rdzenie i wątki, własne instancje modeli
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    models = {}
+
+    def model(spec):
+        if spec not in models:
+            models[spec] = loader(spec)
+        return models[spec]
+
+    try:
+        for spec in preload:
+            model(spec)
+    except Exception as e:
+        logger.exception("Replica loading error", extra=fields(replica=index))
+        results.put(("failed", index, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", index))
+    logger.info("Replica ready", extra=fields(replica=index, cores=cores, threads=threads))
+
+    backlog = []
+    while True:
+        # Pierwsze zadanie (z zaległych albo z kolejki), a potem zadania czekające do max_wait
+        if backlog:
+            pending = [backlog.pop(0)]
+        else:
+            try:
+                pending = [tasks.get(timeout=1.0)]
+            except queue.Empty:
+                if os.getppid() != parent_pid:
+                    return  # Proces serwera zakończył się
+                continue
+        if pending[0] is None:
+            return
+        if pending[0][5] is not None:
+            deadline = time.monotonic() + max_wait
+            while len(pending) < max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    task = tasks.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if task is None or (task[1], task[2], task[5]) != (pending[0][1], pending[0][2], pending[0][5]):
+                    backlog.append(task)  # Inny klucz - przetwarzane w kolejnym obrocie
+                    break
+                pending.append(task)
+
+        _, spec, method, _, _, batch_key = pending[0]
+        results.put(("started", index, [task[0] for task in pending]))  # Przy awarii repliki te zadania kończą się błędem
+        try:
+            target = getattr(model(spec), method)
+            if batch_key is None:
+                outputs = [target(*pending[0][3], **pending[0][4])]
+            else:
+                outputs = target([task[3] for task in pending])
+            for task, output in zip(pending, outputs):
+                results.put(("result", index, task[0], True, output))
+        except Exception as e:
+            logger.exception("Replica task error", extra=fields(replica=index, method=method))
+            for task in pending:
+                results.put(("result", index, task[0], False, f"{type(e).__name__}: {e}"))
+
+
+_pool = None
+
+
+def start_replica_pool(loader, preload=(), replicas=REPLICAS):
+    """Uruchamia wspólną pulę replik (raz na proces), jeśli replicas > 0. Zwraca pulę lub None."""
+    global _pool
+    if _pool is None and replicas > 0:
+        _pool = ReplicaPool(loader, replicas, preload=preload)
+    return _pool
+
+
+def get_replica_pool():
+    """Uruchomiona pula replik lub None (inferencja w procesie serwera)."""
+    return _pool
@@ -0,0 +1,41 @@
+import os
+
+import torch
+
+# Tryb kwantyzacji modeli (można nadpisać zmienną środowiskową):
+#   "none" - pełne wagi fp32,
+#   "int8" - dynamiczna kwantyzacja warstw Linear do int8 (tylko CPU); wagi zajmują ok. 4x mniej,
+#            a mnożenia macierzy są szybsze kosztem niewielkiej utraty dokładności,
+#   "bf16" - wagi i obliczenia w bfloat16, jeśli procesor (AVX512-BF16/AMX) lub GPU to obsługuje.
+QUANTIZE = os.environ.get("QUANTIZE", "none")
+QUANTIZE_MODES = ("none", "int8", "bf16")
+
+
+def bf16_supported(device="cpu"):
+    """Czy urządzenie liczy natywnie w bfloat16 (na starszych CPU bf16 jest wolniejsze niż fp32)."""
+    if device == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        with open("/proc/cpuinfo") as file:
+            flags = file.read()
+    except OSError:
+        return False  # Brak informacji o procesorze (np. Windows)
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def quantize_model(model, mode=QUANTIZE, device="cpu"):
+    """
+    Zwraca (model, faktycznie użyty tryb). Gdy tryb nie jest obsługiwany na danym urządzeniu,
+    model pozostaje w fp32.
+    """
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    if mode == "int8":
+        if device != "cpu":
+            return model, "none"  # Dynamiczna kwantyzacja PyTorch działa tylko na CPU
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), mode
+    if mode == "bf16":
+        if not bf16_supported(device):
+            return model, "none"
+        return model.to(torch.bfloat16), mode
+    return model, mode
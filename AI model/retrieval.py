@@ -0,0 +1,174 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+
+# Konfiguracja wyszukiwania fragmentów (można nadpisać zmiennymi środowiskowymi)
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 0))  # Liczba fragmentów opisu w prompcie (0 = cały opis)
+RETRIEVAL_INDEX_DIR = os.environ.get(
+    "RETRIEVAL_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index")
+)  # Katalog z zapisanymi indeksami
+MAX_PASSAGE_WORDS = 60  # Dłuższe linie dzielone są na zdania
+INDEX_VERSION = 2  # Zmiana tokenizacji unieważnia zapisane indeksy
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "how", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when", "where",
+    "which", "who", "whom", "why", "with"
+}
+
+
+# Słowa pytania wskazujące pole opisu, w którym zwykle jest odpowiedź
+QUERY_HINTS = {
+    "wrote": "author", "written": "author",
+    "crafted": "creator", "created": "creator", "made": "material",
+    "introduced": "origin launched", "invented": "origin creator"
+}
+
+
+def stem(word):
+    # Uproszczone ujednolicenie odmian (mines -> mine, crafted -> craft), takie samo dla opisu i pytania
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    # Małe litery, same słowa, bez słów pomijalnych, ujednolicone odmiany
+    return [stem(word) for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+def tokenize_query(text):
+    # Słowa pytania uzupełnione o nazwy pól z QUERY_HINTS
+    words = re.findall(r"\w+", text.lower())
+    return tokenize(" ".join(words + [QUERY_HINTS[word] for word in words if word in QUERY_HINTS]))
+
+
+def split_passages(text):
+    """
+    Dzieli opis przedmiotu na fragmenty: niepuste linie (opisy mają postać "Pole: wartość"),
+    a zbyt długie linie dodatkowo na zdania.
+    """
+    passages = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line.split()) <= MAX_PASSAGE_WORDS:
+            passages.append(line)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", line):
+            if sentence.strip():
+                passages.append(sentence.strip())
+    return passages
+
+
+class BM25Index:
+    """Indeks BM25 fragmentów jednego opisu (czysty Python, bez dodatkowych zależności)."""
+
+    def __init__(self, passages, term_freqs, doc_freqs, k1=1.5, b=0.75):
+        self.passages = passages
+        self.term_freqs = term_freqs  # Dla każdego fragmentu: słowo -> liczba wystąpień
+        self.doc_freqs = doc_freqs  # Słowo -> liczba fragmentów, w których występuje
+        self.lengths = [sum(tf.values()) for tf in term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, text):
+        passages = split_passages(text)
+        term_freqs = [dict(Counter(tokenize(passage))) for passage in passages]
+        doc_freqs = Counter(word for tf in term_freqs for word in tf)
+        return cls(passages, term_freqs, dict(doc_freqs))
+
+    def to_dict(self):
+        return {"passages": self.passages, "termFreqs": self.term_freqs, "docFreqs": self.doc_freqs}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["passages"], data["termFreqs"], data["docFreqs"])
+
+    def scores(self, query, ignore=()):
+        total = len(self.passages)
+        scores = [0.0] * total
+        for word in set(tokenize_query(query)) - set(ignore):
+            df = self.doc_freqs.get(word)
+            if not df:
+                continue
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for i, tf in enumerate(self.term_freqs):
+                freq = tf.get(word)
+                if freq:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                    scores[i] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def search(self, query, top_k, ignore=()):
+        """
+        Zwraca indeksy top_k najlepiej pasujących fragmentów w kolejności występowania w opisie.
+        Słowa z ignore nie są brane pod uwagę przy ocenie.
+        """
+        scores = self.scores(query, ignore)
+        best = sorted(range(len(scores)), key=lambda i: (-scores[i], i))[:top_k]
+        return sorted(best)
+
+
+def load_or_build_index(item_type, text, index_dir=RETRIEVAL_INDEX_DIR):
+    """
+    Wczytuje indeks z dysku, jeśli istnieje dla tej samej treści opisu i wersji indeksu
+    (nazwa pliku zawiera ich skrót), w przeciwnym razie buduje go i zapisuje.
+    """
+    digest = hashlib.sha1(f"{INDEX_VERSION}\n{text}".encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(index_dir, f"{item_type}-{digest}.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            return BM25Index.from_dict(json.load(file))
+
+    index = BM25Index.build(text)
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(index.to_dict(), file)
+        os.replace(tmp_path, path)  # Atomowo, gdy kilka procesów buduje ten sam indeks
+    except OSError:
+        pass  # Brak zapisu nie blokuje działania - indeks zostanie zbudowany przy kolejnym starcie
+    return index
+
+
+class RetrievalIndex:
+    """Indeksy fragmentów dla wszystkich przedmiotów; do promptu trafia top_k fragmentów."""
+
+    def __init__(self, top_k=RETRIEVAL_TOP_K, index_dir=RETRIEVAL_INDEX_DIR):
+        self.top_k = top_k
+        self.index_dir = index_dir
+        self._indexes = {}
+
+    def rebuild(self, texts):
+        # Podmiana całego słownika, aby równoległe zapytania widziały spójny stan
+        self._indexes = {item_type: load_or_build_index(item_type, text, self.index_dir) for item_type, text in texts.items()}
+
+    def add(self, item_type, text):
+        # Indeks jednego (nowego lub zmienionego) przedmiotu
+        self._indexes = {**self._indexes, item_type: load_or_build_index(item_type, text, self.index_dir)}
+
+    def retrieve(self, item_type, question):
+        """
+        Zwraca tekst złożony z nagłówka opisu (nazwa przedmiotu) i top_k fragmentów
+        najlepiej pasujących do pytania lub None, jeśli typ jest nieznany. Słowa z nazwy
+        przedmiotu są pomijane przy ocenie: pytania zwykle ją powtarzają, a nie wskazują,
+        który fragment zawiera odpowiedź (np. "Material: Diamond" dla "Who crafted the Diamond Pickaxe?").
+        """
+        index = self._indexes.get(item_type)
+        if index is None:
+            return None
+        if len(index.passages) <= self.top_k + 1:
+            return "\n".join(index.passages)  # Opis i tak mieści się w limicie
+        header_words = tokenize(index.passages[0])
+        selected = [i for i in index.search(question, self.top_k + 1, ignore=header_words) if i != 0][:self.top_k]
+        return "\n".join([index.passages[0]] + [index.passages[i] for i in selected])
@@ -0,0 +1,107 @@
+"""
+Produkcyjne uruchomienie serwera (gunicorn) z pulą procesów roboczych.
+
+Modele ładowane są raz, w procesie głównym, przed utworzeniem procesów roboczych (preload),
+dzięki czemu strony pamięci z wagami są współdzielone przez procesy (copy-on-write)
+zamiast być kopiowane do każdego z nich. Przy starcie raportowane jest zużycie pamięci
+procesu głównego i każdego procesu roboczego oraz szacowana przepustowość.
+
+Przykład:
+    python serve.py --workers 2 --threads 4 --backends text2text-v2
+"""
+import argparse
+import os
+import time
+
+import torch
+from gunicorn.app.base import BaseApplication
+
+from logging_config import fields, get_logger
+from metrics import memory_usage
+from process_pool import REPLICAS
+from server import create_app, warm_up, ENABLED_BACKENDS, WARMUP
+
+WORKERS = int(os.environ.get("WORKERS", 2))  # Liczba procesów roboczych
+THREADS = int(os.environ.get("THREADS", 4))  # Liczba wątków obsługujących zapytania w każdym procesie
+BIND = os.environ.get("BIND", "0.0.0.0:5000")  # Adres nasłuchiwania
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", 0))  # Wątki PyTorch na proces (0 = rdzenie / liczba procesów)
+logger = get_logger("serve")
+
+CALIBRATION_ITEM = ("diamondpickaxe", "Who crafted the Diamond Pickaxe?")  # Zapytanie do pomiaru opóźnienia
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, backend_names, workers, threads, bind, torch_threads):
+        self.backend_names = backend_names
+        self.workers = workers
+        self.threads = threads
+        self.bind = bind
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        super().__init__()
+
+    def load_config(self):
+        self.cfg.set("bind", self.bind)
+        self.cfg.set("workers", self.workers)
+        self.cfg.set("threads", self.threads)  # Wątki => worker "gthread"
+        # Modele ładowane przed fork(); z pulą replik aplikacja (i pula) powstaje w procesie roboczym,
+        # który odbiera wyniki replik
+        self.cfg.set("preload_app", REPLICAS == 0)
+        self.cfg.set("timeout", 120)
+        self.cfg.set("post_fork", self.post_fork)
+        self.cfg.set("post_worker_init", self.post_worker_init)
+
+    def load(self):
+        # Wykonywane raz w procesie głównym (preload) lub w procesie roboczym (REPLICAS > 0);
+        # rozgrzewka zawsze w procesach roboczych,
+        # bo wątki uruchomione przed fork() nie istnieją w procesach potomnych
+        app = create_app(self.backend_names, eager=self.backend_names, background_load=False, warmup=False)
+        logger.info("Models loaded", extra=fields(pid=os.getpid(), **memory_usage()))
+        return app
+
+    def post_fork(self, server, worker):
+        # Każdy proces dostaje własną część rdzeni, aby procesy nie konkurowały o te same wątki
+        torch.set_num_threads(self.torch_threads)
+
+    def post_worker_init(self, worker):
+        # Rozgrzewka przed przyjęciem pierwszego zapytania (proces roboczy nie obsługuje jeszcze ruchu)
+        app = worker.wsgi
+        if WARMUP:
+            for name in self.backend_names:
+                warm_up(app.extensions["backends"][name], app.extensions["item_store"], app.extensions["batch_pool"])
+
+        # Pomiar opóźnienia jednego zapytania w procesie roboczym i szacowana przepustowość
+        client = app.test_client()
+        item_type, question = CALIBRATION_ITEM
+        for name in self.backend_names:
+            start_time = time.time()
+            client.post("/generate", json={"itemType": item_type, "question": question, "model": name})
+            latency = time.time() - start_time
+            logger.info("Worker calibrated", extra=fields(
+                worker=worker.pid, backend=name, torchThreads=self.torch_threads, latency=round(latency, 3),
+                workerReqPerSec=round(1 / latency, 2), totalReqPerSec=round(self.workers / latency, 2), workers=self.workers,
+                **memory_usage()
+            ))
+        # Wyniki kalibracji nie powinny trafiać do pamięci odpowiedzi
+        for backend in app.extensions["backends"].values():
+            if backend.answer_cache is not None:
+                backend.answer_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Production server with a worker pool sharing preloaded models")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--bind", default=BIND)
+    parser.add_argument("--torch-threads", type=int, default=TORCH_THREADS)
+    parser.add_argument("--backends", default=",".join(ENABLED_BACKENDS), help="Comma-separated backend names")
+    args = parser.parse_args()
+
+    if REPLICAS > 0 and args.workers > 1:
+        # Wyniki replik trafiają do jednego procesu; repliki zastępują wiele procesów roboczych
+        parser.error("REPLICAS requires --workers 1")
+    backend_names = [name for name in args.backends.split(",") if name]
+    ProductionServer(backend_names, args.workers, args.threads, args.bind, args.torch_threads).run()
+
+
+if __name__ == '__main__':
+    main()
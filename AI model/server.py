@@ -0,0 +1,541 @@
+import asyncio
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask_cors import CORS
+
+from backends import BACKENDS, BackendError, create_backend, load_replica, seq2seq_queue_depths
+from batching import MAX_BATCH_SIZE, TOKENIZER_LOCK
+from catalog import CatalogEntry, count_tokens, normalize_item_id
+from executor import InferenceExecutor, QueueFullError, REQUEST_TIMEOUT
+from item_store import ItemStore
+from logging_config import fields, get_logger, set_request_id
+from metrics import REGISTRY, REQUEST_SECONDS, REQUESTS, CallbackMetric, Registry, memory_usage
+from process_pool import REPLICA_START_TIMEOUT, ReplicaError, start_replica_pool
+from retrieval import RetrievalIndex, RETRIEVAL_TOP_K
+
+# Konfiguracja serwera (można nadpisać zmiennymi środowiskowymi)
+ENABLED_BACKENDS = [name for name in os.environ.get("BACKENDS", ",".join(BACKENDS)).split(",") if name]  # Dostępne backendy
+DEFAULT_BACKEND = os.environ.get("DEFAULT_BACKEND", "text2text-v2")  # Backend używany, gdy zapytanie nie wskazuje modelu
+EAGER_BACKENDS = os.environ.get("EAGER_BACKENDS", "")  # Backendy ładowane przy starcie ("all" = wszystkie)
+LOAD_IN_BACKGROUND = os.environ.get("LOAD_IN_BACKGROUND", "0") == "1"  # Ładowanie w tle: port otwarty od razu, /ready zwraca 503 do końca ładowania
+logger = get_logger("server")
+
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", 64))  # Maksymalna liczba pytań w jednym /generate_batch
+WARMUP = os.environ.get("WARMUP", "1") == "1"  # Rozgrzewka backendów ładowanych przy starcie (przed zgłoszeniem gotowości)
+WARMUP_MAX_ITEMS = int(os.environ.get("WARMUP_MAX_ITEMS", 20))  # Liczba przedmiotów w rozgrzewce (duży katalog)
+WARMUP_BATCH_SIZES = [int(size) for size in os.environ.get("WARMUP_BATCH_SIZES", "1,4").split(",") if size]  # Rozmiary batchy w rozgrzewce
+WARMUP_QUESTIONS = (  # Reprezentatywne pytania graczy
+    "What is the {item} made of?",
+    "Who created the {item}?",
+    "What are the abilities of the {item}?",
+    "How durable is the {item}?",
+)
+
+
+def create_app(backend_names=None, default_backend=None, eager=None, quantize=None, background_load=None, warmup=None):
+    """
+    Tworzy aplikację Flask obsługującą wiele backendów (QA, podsumowanie, FLAN-T5).
+    Backend wybierany jest polem "model" w zapytaniu lub prefiksem ścieżki (/<model>/generate).
+    Modele ładowane są przy pierwszym użyciu, chyba że zostaną wskazane w eager.
+    quantize nadpisuje tryb kwantyzacji z konfiguracji (QUANTIZE), background_load
+    ładowanie modeli w tle (LOAD_IN_BACKGROUND), a warmup rozgrzewkę po załadowaniu (WARMUP).
+    """
+    backend_names = list(backend_names or ENABLED_BACKENDS)
+    default_backend = default_backend or (DEFAULT_BACKEND if DEFAULT_BACKEND in backend_names else backend_names[0])
+    if eager is None:
+        eager = backend_names if EAGER_BACKENDS == "all" else [name for name in EAGER_BACKENDS.split(",") if name]
+    warmup = WARMUP if warmup is None else warmup
+
+    # Inicjalizacja aplikacji Flask
+    app = Flask(__name__)
+    CORS(app)  # Umożliwienie CORS dla aplikacji
+
+    logger.info("Initializing AI server...", extra=fields(backends=backend_names, eager=eager))  # Informacja o rozpoczęciu inicjalizacji serwera
+
+    # Wspólny magazyn opisów przedmiotów dla wszystkich backendów
+    # Przy RETRIEVAL_TOP_K > 0 do promptu trafiają tylko fragmenty opisu pasujące do pytania
+    item_store = ItemStore(retrieval=RetrievalIndex() if RETRIEVAL_TOP_K > 0 else None)
+    backends = {name: create_backend(name, item_store, quantize) for name in backend_names}
+
+    def clear_item_caches():
+        for backend in backends.values():
+            if backend.loaded:
+                backend.on_reload()  # Czyszczenie pamięci zależnych od opisów
+
+    item_store.add_reload_listener(clear_item_caches)
+    # Opcjonalna pula replik (REPLICAS > 0): procesy tworzone przed wątkami serwera i ładowaniem modeli
+    replica_pool = start_replica_pool(load_replica, preload=list(dict.fromkeys(
+        spec for name in eager for spec in backends[name].replica_specs
+    )))
+    # Wątki dla pytań z /generate_batch: zgłaszane równocześnie, trafiają do wspólnych batchy modelu
+    batch_pool = ThreadPoolExecutor(max_workers=MAX_BATCH_SIZE, thread_name_prefix="generate-batch")
+    starting = {"pending": list(eager), "error": None}  # Backendy jeszcze nieładowane lub nierozgrzane
+
+    def load_eager():
+        try:
+            if replica_pool is not None and not replica_pool.wait_ready(REPLICA_START_TIMEOUT):
+                # Repliki ładują modele równolegle z procesem serwera; błąd ładowania zgłasza wait_ready
+                raise ReplicaError(f"Replicas not ready after {REPLICA_START_TIMEOUT:g}s")
+            for name in eager:
+                backends[name].load()  # Ładowanie modelu przy starcie zamiast przy pierwszym zapytaniu
+                if warmup:
+                    warm_up(backends[name], item_store, batch_pool)
+                starting["pending"] = starting["pending"][1:]
+        except Exception as e:
+            starting["error"] = str(e)
+            raise
+
+    def load_in_background():
+        try:
+            load_eager()
+        except Exception:
+            logger.exception("Startup error")  # Serwer działa dalej, /ready zwraca 503 z opisem błędu
+
+    if background_load if background_load is not None else LOAD_IN_BACKGROUND:
+        threading.Thread(target=load_in_background, name="model-loader", daemon=True).start()
+    else:
+        load_eager()
+
+    # Pula wątków dla asynchronicznego /generate (ograniczona, z odrzucaniem przy przeciążeniu)
+    executor = InferenceExecutor()
+
+    app.extensions["item_store"] = item_store
+    app.extensions["backends"] = backends
+    app.extensions["default_backend"] = default_backend
+    app.extensions["executor"] = executor
+    app.extensions["batch_pool"] = batch_pool
+
+    metrics_registry = register_app_metrics(backends, executor, replica_pool)
+
+    @app.before_request
+    def start_request():
+        g.start_time = time.perf_counter()
+        # Identyfikator zapytania (od klienta lub nowy) trafia do każdego rekordu logu
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+        set_request_id(g.request_id)
+        # Katalog zmieniony przez inny proces roboczy (serve.py) - przeładowanie także w tym procesie
+        if item_store.refresh():
+            logger.info("Item catalog changed on disk, reloaded", extra=fields(items=len(item_store.catalog)))
+
+    @app.after_request
+    def record_request(response):
+        # Dla /generate/stream mierzony jest czas do wysłania nagłówków (początku strumienia)
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        seconds = time.perf_counter() - g.start_time
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+        response.headers["X-Request-ID"] = g.request_id
+        if endpoint != "/metrics":
+            logger.info("Request", extra=fields(method=request.method, path=request.path, status=response.status_code,
+                                                seconds=round(seconds, 4)))
+        return response
+
+    @app.teardown_request
+    def end_request(_error):
+        set_request_id(None)  # Wątek serwera obsłuży kolejne zapytania
+
+    def select_backend(data, model_name):
+        name = model_name or data.get('model') or default_backend
+        if name not in backends:
+            raise BackendError(f"Unknown model: {name}", 404)
+        return backends[name]
+
+    @app.route('/generate', methods=['POST'])
+    @app.route('/<model_name>/generate', methods=['POST'])
+    def handle_query(model_name=None):
+        try:
+            data = request.json  # Odczytanie danych JSON
+            item_type = data.get('itemType')  # Pobranie typu przedmiotu
+            question = data.get('question')  # Pobranie pytania
+
+            if not item_type or not question:  # Sprawdzenie, czy wymagane parametry są obecne
+                return jsonify({"error": "Missing required parameters"}), 400  # Błąd, jeśli brakuje parametrów
+
+            backend = select_backend(data, model_name)
+            result = backend.answer(item_type, question, data)
+            result["model"] = backend.name  # Nazwa backendu, który udzielił odpowiedzi
+            return jsonify(result)
+
+        except BackendError as e:
+            return jsonify({"error": str(e)}), e.status
+        except Exception as e:
+            logger.exception("Server error")  # Logowanie błędu
+            return jsonify({"error": str(e)}), 500  # Zwrócenie błędu w formacie JSON
+
+    def answer_query(query, model_name):
+        # Jedno pytanie z /generate_batch; błąd dotyczy tylko tego pytania
+        try:
+            if not isinstance(query, dict) or not query.get('itemType') or not query.get('question'):
+                return {"error": "Missing required parameters", "status": 400}
+            backend = select_backend(query, model_name)
+            result = backend.answer(query['itemType'], query['question'], query)
+            result["model"] = backend.name
+            return result
+        except BackendError as e:
+            return {"error": str(e), "status": e.status}
+        except Exception as e:
+            logger.exception("Server error")  # Logowanie błędu
+            return {"error": str(e), "status": 500}
+
+    @app.route('/generate_batch', methods=['POST'])
+    @app.route('/<model_name>/generate_batch', methods=['POST'])
+    def handle_batch_query(model_name=None):
+        """
+        Wiele pytań w jednym zapytaniu: {"queries": [{"itemType": ..., "question": ...}, ...]}.
+        Pytania mogą dotyczyć różnych przedmiotów (i modeli). Wyniki zwracane są w tej samej
+        kolejności; błędne pytanie dostaje własne pole "error" zamiast przerywać całość.
+        """
+        return run_batch(request.json, answer_query, model_name)
+
+    def run_batch(data, answer_fn, model_name):
+        # Lista pytań ({"queries": [...]} lub sama lista) przetwarzana równolegle w puli wątków
+        queries = data.get('queries') if isinstance(data, dict) else data
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "Missing required parameters"}), 400
+        if len(queries) > MAX_BATCH_QUERIES:
+            return jsonify({"error": f"Too many queries (max {MAX_BATCH_QUERIES})"}), 400
+
+        if isinstance(data, dict):
+            # Pola wspólne (np. "model", "mode") mogą być podane raz dla całej listy
+            shared = {key: value for key, value in data.items() if key != 'queries'}
+            queries = [{**shared, **query} if isinstance(query, dict) else query for query in queries]
+        context = contextvars.copy_context()  # Identyfikator zapytania także w wątkach puli
+        results = list(batch_pool.map(lambda query: context.copy().run(answer_fn, query, model_name), queries))
+        return jsonify({"results": results})
+
+    def refine_query(query, model_name):
+        # Jedna para (pytanie, odpowiedź wstępna) z /refine; błąd dotyczy tylko tej pary
+        try:
+            if not isinstance(query, dict) or not query.get('question') or not query.get('initialAnswer'):
+                return {"error": "Missing required parameters", "status": 400}
+            backend = select_backend(query, model_name)
+            result = backend.refine(query['question'], query['initialAnswer'], query)
+            result["model"] = backend.name
+            return result
+        except BackendError as e:
+            return {"error": str(e), "status": e.status}
+        except Exception as e:
+            logger.exception("Server error")  # Logowanie błędu
+            return {"error": str(e), "status": 500}
+
+    @app.route('/refine', methods=['POST'])
+    @app.route('/<model_name>/refine', methods=['POST'])
+    def handle_refine(model_name=None):
+        """
+        Dopracowanie gotowej odpowiedzi do pełnego zdania: {"question": ..., "initialAnswer": ...}
+        zwraca {"refinedResponse": ...}. Wersja batch: {"queries": [{"question": ..., "initialAnswer": ...}, ...]}
+        zwraca "results" w tej samej kolejności.
+        """
+        data = request.json
+        if isinstance(data, list) or (isinstance(data, dict) and 'queries' in data):
+            return run_batch(data, refine_query, model_name)
+        result = refine_query(data, model_name)
+        if "error" in result:
+            return jsonify({"error": result["error"]}), result["status"]
+        return jsonify(result)
+
+    @app.route('/generate/stream', methods=['POST'])
+    @app.route('/<model_name>/generate/stream', methods=['POST'])
+    def handle_query_stream(model_name=None):
+        """
+        Strumieniowa wersja /generate (Server-Sent Events). Zdarzenia "token" niosą kolejne
+        fragmenty odpowiedzi, "done" pełny wynik (jak w /generate) z czasem do pierwszego
+        fragmentu, a "error" błąd powstały w trakcie generowania. Strumień zajmuje miejsce
+        w limicie wykonawcy inferencji, więc przy przeciążeniu serwer od razu zwraca 503.
+        """
+        release = None
+        try:
+            data = request.json  # Odczytanie danych JSON
+            item_type = data.get('itemType')  # Pobranie typu przedmiotu
+            question = data.get('question')  # Pobranie pytania
+
+            if not item_type or not question:  # Sprawdzenie, czy wymagane parametry są obecne
+                return jsonify({"error": "Missing required parameters"}), 400  # Błąd, jeśli brakuje parametrów
+
+            backend = select_backend(data, model_name)
+            release = executor.open_stream()
+            events = backend.stream(item_type, question, data)
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}  # Szybkie odrzucenie przy przeciążeniu
+        except BackendError as e:
+            if release is not None:
+                release()
+            return jsonify({"error": str(e)}), e.status
+        except Exception as e:
+            if release is not None:
+                release()
+            logger.exception("Server error")  # Logowanie błędu
+            return jsonify({"error": str(e)}), 500  # Zwrócenie błędu w formacie JSON
+
+        def generate_events():
+            start_time = time.time()
+            first_token_time = None
+            try:
+                for event, payload in events:
+                    if event == "token" and first_token_time is None:
+                        first_token_time = time.time() - start_time
+                    if event == "done":
+                        payload["model"] = backend.name  # Nazwa backendu, który udzielił odpowiedzi
+                        payload["timeToFirstToken"] = first_token_time
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            except Exception as e:
+                logger.exception("Server error")  # Logowanie błędu
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            finally:
+                events.close()  # Rozłączony klient zatrzymuje generowanie
+
+        response = Response(
+            stream_with_context(generate_events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Bez buforowania po drodze
+        )
+        response.call_on_close(release)  # Miejsce zwalniane po zakończeniu lub zerwaniu strumienia
+        return response
+
+    @app.route('/async/generate', methods=['POST'])
+    @app.route('/<model_name>/async/generate', methods=['POST'])
+    async def handle_query_async(model_name=None):
+        """
+        Wariant /generate, który przekazuje inferencję do ograniczonej puli wątków
+        i czeka na wynik bez blokowania pętli zdarzeń. Przy pełnej kolejce zwraca
+        od razu 503, a po przekroczeniu REQUEST_TIMEOUT - 504.
+        """
+        try:
+            data = request.json  # Odczytanie danych JSON
+            item_type = data.get('itemType')  # Pobranie typu przedmiotu
+            question = data.get('question')  # Pobranie pytania
+
+            if not item_type or not question:  # Sprawdzenie, czy wymagane parametry są obecne
+                return jsonify({"error": "Missing required parameters"}), 400  # Błąd, jeśli brakuje parametrów
+
+            try:
+                timeout = float(data.get('timeout', REQUEST_TIMEOUT))  # Klient może skrócić limit
+            except (TypeError, ValueError):
+                timeout = None
+            if timeout is None or not math.isfinite(timeout) or timeout <= 0:
+                return jsonify({"error": "Invalid timeout (expected a positive number of seconds)"}), 400
+            timeout = min(timeout, REQUEST_TIMEOUT)
+
+            backend = select_backend(data, model_name)
+            result = await executor.run(backend.answer, item_type, question, data, timeout=timeout)
+            result["model"] = backend.name  # Nazwa backendu, który udzielił odpowiedzi
+            return jsonify(result)
+
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}  # Szybkie odrzucenie przy przeciążeniu
+        except asyncio.TimeoutError:
+            return jsonify({"error": "Request timed out"}), 504
+        except BackendError as e:
+            return jsonify({"error": str(e)}), e.status
+        except Exception as e:
+            logger.exception("Server error")  # Logowanie błędu
+            return jsonify({"error": str(e)}), 500  # Zwrócenie błędu w formacie JSON
+
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        # Żywotność: proces odpowiada (także w trakcie ładowania modeli)
+        return jsonify({"status": "ok"})
+
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        # Gotowość do przyjmowania ruchu: backendy ładowane przy starcie są w pamięci i rozgrzane
+        if starting["error"] is not None:
+            return jsonify({"ready": False, "error": starting["error"]}), 503
+        if starting["pending"]:
+            return jsonify({"ready": False, "loading": starting["pending"]}), 503
+        if replica_pool is not None and not replica_pool.healthy:
+            # Repliki nie są uruchamiane ponownie - instancję należy zrestartować
+            return jsonify({"ready": False, "error": "Replica failure", "replicas": replica_pool.stats()["errors"]}), 503
+        return jsonify({"ready": True})
+
+    @app.route('/executor/stats', methods=['GET'])
+    def executor_stats():
+        stats = executor.stats()  # Zadania w toku, odrzucone i przekroczone
+        if replica_pool is not None:
+            stats["replicas"] = replica_pool.stats()  # Rdzenie, zadania w toku i wykonane przez każdą replikę
+        return jsonify(stats)
+
+    @app.route('/reload', methods=['POST'])
+    def reload_items():
+        try:
+            count = item_store.reload()  # Ponowne wczytanie opisów przedmiotów z dysku (i czyszczenie pamięci odpowiedzi)
+            logger.info("Reloaded item descriptions", extra=fields(items=count))
+            return jsonify({"reloaded": count})
+        except Exception as e:
+            logger.exception("Reload error")  # Logowanie błędu
+            return jsonify({"error": str(e)}), 500
+
+    def loaded_tokenizers():
+        # Tokenizery załadowanych modeli: nazwa modelu -> tokenizer
+        return {backend.model_name: backend.tokenizer for backend in backends.values() if backend.loaded}
+
+    def item_tokens(entry, tokenizers):
+        # Brakujące w katalogu liczby tokenów (np. katalog zbudowany z --no-tokens) liczone raz, tylko w pamięci
+        missing = {name: tokenizer for name, tokenizer in tokenizers.items() if name not in entry.tokens}
+        if missing:
+            with TOKENIZER_LOCK:
+                entry.tokens = {**entry.tokens, **count_tokens(entry.text, missing)}
+        return entry.tokens
+
+    @app.route('/items', methods=['GET'])
+    def list_items():
+        # Katalog przedmiotów bez treści opisów
+        entries = item_store.catalog.entries()
+        tokenizers = loaded_tokenizers()
+        return jsonify({
+            "count": len(entries),
+            "items": [{"id": entry.id, "aliases": entry.aliases, "tokens": item_tokens(entry, tokenizers)} for entry in entries]
+        })
+
+    @app.route('/items', methods=['POST'])
+    def add_item():
+        """
+        Dodaje przedmiot bez restartu: {"id": ..., "text": ..., "aliases": [...]}. Przedmiot
+        jest zapisywany w katalogu i od razu dostępny dla wszystkich backendów (pozostałe
+        procesy robocze przeładowują katalog po wykryciu zmiany pliku).
+        """
+        try:
+            data = request.json
+            if not isinstance(data, dict) or not data.get('id') or not data.get('text'):
+                return jsonify({"error": "Missing required parameters"}), 400
+            item_id, text, aliases = data['id'], data['text'], data.get('aliases', [])
+            if not isinstance(item_id, str) or not isinstance(text, str) or not isinstance(aliases, list) \
+                    or not all(isinstance(alias, str) for alias in aliases):
+                return jsonify({"error": "Invalid parameters: id and text must be strings, aliases a list of strings"}), 400
+            item_id = normalize_item_id(item_id)
+            if not item_id or not text.strip():
+                return jsonify({"error": "Missing required parameters"}), 400
+
+            # Liczby tokenów dla tokenizerów załadowanych modeli
+            with TOKENIZER_LOCK:
+                tokens = count_tokens(text, loaded_tokenizers())
+            entry = CatalogEntry(item_id, text, list(aliases), tokens)
+            replaced = item_store.add_item(entry)
+            if replaced:
+                clear_item_caches()  # Odpowiedzi mogły zależeć od poprzedniego opisu
+            logger.info("Item added", extra=fields(item=item_id, replaced=replaced, tokens=tokens))
+            return jsonify({"id": item_id, "aliases": entry.aliases, "tokens": tokens, "replaced": replaced}), 200 if replaced else 201
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409  # Nazwa używana przez inny przedmiot
+        except Exception as e:
+            logger.exception("Item add error")  # Logowanie błędu
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/cache/stats', methods=['GET'])
+    def cache_stats():
+        # Liczniki trafień i chybień pamięci odpowiedzi dla załadowanych backendów
+        return jsonify({name: backend.cache_stats() for name, backend in backends.items() if backend.loaded})
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        # Format tekstowy Prometheusa: metryki wspólne (opóźnienia etapów, batche) i metryki tej aplikacji
+        return Response(REGISTRY.render() + metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route('/models', methods=['GET'])
+    def list_models():
+        return jsonify({
+            "default": default_backend,
+            "models": {
+                name: {"model": backend.model_name, "refineModel": getattr(backend, "refine_model_name", None),
+                       "loaded": backend.loaded, "quantization": backend.quantization}
+                for name, backend in backends.items()
+            }
+        })
+
+    return app
+
+
+def warm_up(backend, item_store, pool, batch_sizes=None):
+    """
+    Rozgrzewka załadowanego backendu: pytanie o każdy przedmiot (do WARMUP_MAX_ITEMS) pełną ścieżką /generate
+    (inicjalizacja jąder obliczeniowych, tokenizera i pamięci enkodera), a potem grupy
+    równoczesnych pytań o oczekiwanych rozmiarach batchy. Odpowiedzi z rozgrzewki
+    nie zostają w pamięci odpowiedzi.
+    """
+    start_time = time.time()
+    item_types = item_store.item_types()[:WARMUP_MAX_ITEMS]
+    if not item_types:
+        return
+    for item_type in item_types:
+        backend.answer(item_type, WARMUP_QUESTIONS[0].format(item=item_type), {})
+    for size in batch_sizes or WARMUP_BATCH_SIZES:
+        if backend.answer_cache is not None:
+            backend.answer_cache.clear()  # Każde pytanie grupy musi trafić do modelu
+        queries = [
+            (item_types[i % len(item_types)], WARMUP_QUESTIONS[i // len(item_types) % len(WARMUP_QUESTIONS)])
+            for i in range(size)
+        ]
+        list(pool.map(lambda query: backend.answer(query[0], query[1].format(item=query[0]), {}), queries))
+    if backend.answer_cache is not None:
+        backend.answer_cache.clear()
+    logger.info("Backend warmed up", extra=fields(backend=backend.name, items=len(item_types),
+                                                  batchSizes=batch_sizes or WARMUP_BATCH_SIZES,
+                                                  seconds=round(time.time() - start_time, 3)))
+
+
+def register_app_metrics(backends, executor, replica_pool=None):
+    """Metryki odczytywane przy eksporcie: kolejki, pamięć odpowiedzi, rozmiar modeli i pamięć procesu."""
+    registry = Registry()
+
+    if replica_pool is not None:
+        CallbackMetric("nai_replica_pending", "Tasks queued or running in the replica pool", (),
+                       lambda: {(): replica_pool.stats()["pending"]}, registry=registry)
+        CallbackMetric("nai_replica_tasks_total", "Tasks completed by each replica process", ("replica",),
+                       lambda: {(str(index),): count for index, count in enumerate(replica_pool.stats()["completed"])},
+                       type_name="counter", registry=registry)
+
+    def cache_stat(field):
+        return lambda: {
+            (name,): backend.cache_stats()[field]
+            for name, backend in backends.items() if backend.loaded and backend.answer_cache is not None
+        }
+
+    CallbackMetric("nai_batch_queue_depth", "Prompts waiting in a micro-batch queue", ("model", "batcher"),
+                   seq2seq_queue_depths, registry=registry)
+    CallbackMetric("nai_executor_pending", "Inference tasks running or queued in the async executor", (),
+                   lambda: {(): executor.stats()["pending"]}, registry=registry)
+    CallbackMetric("nai_executor_streams", "Streaming responses currently generating", (),
+                   lambda: {(): executor.stats()["streams"]}, registry=registry)
+    CallbackMetric("nai_executor_rejected_total", "Async and streaming requests rejected with 503", (),
+                   lambda: {(): executor.stats()["rejected"]}, type_name="counter", registry=registry)
+    CallbackMetric("nai_executor_timeouts_total", "Async requests that timed out with 504", (),
+                   lambda: {(): executor.stats()["timeouts"]}, type_name="counter", registry=registry)
+    CallbackMetric("nai_answer_cache_hits_total", "Exact answer cache hits", ("backend",),
+                   cache_stat("hits"), type_name="counter", registry=registry)
+    CallbackMetric("nai_answer_cache_near_hits_total", "Near-duplicate answer cache hits", ("backend",),
+                   cache_stat("nearHits"), type_name="counter", registry=registry)
+    CallbackMetric("nai_answer_cache_misses_total", "Answer cache misses", ("backend",),
+                   cache_stat("misses"), type_name="counter", registry=registry)
+    CallbackMetric("nai_answer_cache_hit_ratio", "Answer cache hit ratio (exact + near)", ("backend",),
+                   cache_stat("hitRate"), registry=registry)
+    CallbackMetric("nai_answer_cache_entries", "Answers held in the cache", ("backend",),
+                   cache_stat("size"), registry=registry)
+    CallbackMetric("nai_refine_cache_hits_total", "Refinement cache hits (/refine)", ("backend",),
+                   lambda: {(name,): backend.cache_stats()["refine"]["hits"]
+                            for name, backend in backends.items() if backend.loaded and hasattr(backend, "refine_cache")},
+                   type_name="counter", registry=registry)
+    CallbackMetric("nai_refine_cache_misses_total", "Refinement cache misses (/refine)", ("backend",),
+                   lambda: {(name,): backend.cache_stats()["refine"]["misses"]
+                            for name, backend in backends.items() if backend.loaded and hasattr(backend, "refine_cache")},
+                   type_name="counter", registry=registry)
+    CallbackMetric("nai_model_bytes", "Size of loaded model weights in bytes", ("backend", "model", "quantization"),
+                   lambda: {(name, backend.model_name, backend.quantization): backend.model_bytes
+                            for name, backend in backends.items() if backend.loaded and backend.model_bytes is not None},
+                   registry=registry)
+    CallbackMetric("nai_process_memory_bytes", "Process memory (rss, pss, shared) in bytes", ("type",),
+                   lambda: {(kind[:-2],): int(mb * 1024 * 1024) for kind, mb in memory_usage().items()},
+                   registry=registry)
+    return registry
+
+
+if __name__ == '__main__':
+    app = create_app()
+    app.run(port=5000)  # Uruchomienie serwera na porcie 5000
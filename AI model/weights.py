@@ -0,0 +1,86 @@
+import itertools
+import os
+import re
+
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import AutoConfig, AutoTokenizer, GenerationConfig
+
+from logging_config import fields, get_logger
+
+# Katalog z wagami przekonwertowanymi do safetensors (można nadpisać zmienną środowiskową)
+WEIGHTS_DIR = os.environ.get("WEIGHTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights"))
+WEIGHTS_FILE = "model.safetensors"
+BUFFERS_FILE = "buffers.safetensors"  # Bufory spoza state_dict (persistent=False), np. position_ids
+logger = get_logger("weights")
+
+
+def weights_path(model_name, weights_dir=None):
+    """Katalog lokalnej kopii modelu (np. google/flan-t5-base -> weights/google--flan-t5-base)."""
+    return os.path.join(weights_dir or WEIGHTS_DIR, re.sub(r"[^\w.-]", "--", model_name))
+
+
+def has_local_weights(model_name, weights_dir=None):
+    return os.path.isfile(os.path.join(weights_path(model_name, weights_dir), WEIGHTS_FILE))
+
+
+def convert(model_class, model_name, weights_dir=None):
+    """
+    Jednorazowa konwersja: pobiera model (lub bierze go z pamięci Hugging Face) i zapisuje
+    wagi w jednym pliku safetensors razem z konfiguracją i tokenizerem. Zwraca ścieżkę katalogu.
+    """
+    path = weights_path(model_name, weights_dir)
+    model = model_class.from_pretrained(model_name)
+    model.save_pretrained(path, safe_serialization=True, max_shard_size="100GB")  # Jeden plik, bez podziału na części
+    persistent = set(model.state_dict())
+    buffers = {name: buffer.contiguous() for name, buffer in model.named_buffers() if name not in persistent}
+    if buffers:
+        save_file(buffers, os.path.join(path, BUFFERS_FILE))  # Przy ładowaniu model powstaje bez nich (urządzenie meta)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(path)
+    return path
+
+
+def _assign_buffers(model, buffers):
+    # Bufory spoza state_dict (load_state_dict ich nie przyjmuje) wstawiane bezpośrednio do modułów
+    for name, tensor in buffers.items():
+        module_name, _, buffer_name = name.rpartition(".")
+        model.get_submodule(module_name).register_buffer(buffer_name, tensor, persistent=False)
+
+
+def load_model(model_class, model_name, weights_dir=None):
+    """
+    Ładuje model z lokalnej kopii safetensors, jeśli istnieje, w przeciwnym razie przez from_pretrained.
+    Wagi z kopii lokalnej nie są kopiowane do pamięci procesu: tensory wskazują na plik
+    odwzorowany w pamięci (mmap), więc start nie czyta całego pliku, a procesy robocze
+    współdzielą te same strony pamięci podręcznej systemu.
+    """
+    path = weights_path(model_name, weights_dir)
+    if not has_local_weights(model_name, weights_dir):
+        return model_class.from_pretrained(model_name)
+
+    config = AutoConfig.from_pretrained(path)
+    with torch.device("meta"):
+        # Szkielet bez alokacji i inicjalizacji wag; kontekst urządzenia dotyczy tylko bieżącego wątku,
+        # więc równoległe ładowanie innych modeli (i tworzenie modułów w innych wątkach) nie jest zaburzone
+        model = model_class.from_config(config)
+    state_dict = load_file(os.path.join(path, WEIGHTS_FILE))
+    model.load_state_dict(state_dict, strict=False, assign=True)  # assign: parametr = tensor z pliku
+    buffers_path = os.path.join(path, BUFFERS_FILE)
+    if os.path.isfile(buffers_path):
+        _assign_buffers(model, load_file(buffers_path))
+    model.tie_weights()  # Wagi współdzielone zapisane w pliku tylko raz
+
+    missing = [name for name, tensor in itertools.chain(model.named_parameters(), model.named_buffers()) if tensor.is_meta]
+    if missing:
+        # Plik nie pasuje do architektury (lub kopia sprzed zapisu buforów) - bezpieczne ładowanie standardową ścieżką
+        logger.warning("Local weights incomplete, using from_pretrained", extra=fields(model=model_name, missing=missing[:5]))
+        return model_class.from_pretrained(path)
+    if os.path.isfile(os.path.join(path, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(path)
+    return model.eval()
+
+
+def load_tokenizer(model_name, weights_dir=None):
+    """Tokenizer z lokalnej kopii modelu, jeśli istnieje."""
+    path = weights_path(model_name, weights_dir)
+    return AutoTokenizer.from_pretrained(path if has_local_weights(model_name, weights_dir) else model_name)
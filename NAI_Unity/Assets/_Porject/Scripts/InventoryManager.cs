@@ -133,6 +133,12 @@ public class InventoryManager : MonoBehaviour
                 else
                     Debug.LogError("answerText jest null!");
             };
+            // Odpowiedź strumieniowana pojawia się na bieżąco
+            queryManager.OnPartialAnswer = (partial) =>
+            {
+                if (answerText != null)
+                    answerText.text = partial;
+            };
         }
     }
 
@@ -188,6 +194,10 @@ public class InventoryManager : MonoBehaviour
                 questionTexts[i].text = "";
             }
         }
+
+        // Odpowiedzi na gotowe pytania pobierane jednym zapytaniem, zanim gracz je wybierze
+        if (queryManager != null)
+            queryManager.PrefetchAnswers(item.itemType, item.possibleQuestions);
     }
 
     private void ClearQueryUI()
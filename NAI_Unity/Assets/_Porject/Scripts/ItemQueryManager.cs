@@ -1,7 +1,9 @@
 using UnityEngine;
 using UnityEngine.Networking;
 using System.Collections;
+using System.Collections.Generic;
 using System;
+using System.Text;
 
 [Serializable]
 public class QueryRequest
@@ -17,14 +19,147 @@ public class QueryResponse
     public string error;
 }
 
+[Serializable]
+public class BatchQueryRequest
+{
+    public QueryData[] queries;
+}
+
+[Serializable]
+public class BatchQueryResponse
+{
+    public QueryResponse[] results;
+}
+
+[Serializable]
+public class StreamToken
+{
+    public string text;
+}
+
+// Odbiera odpowiedź Server-Sent Events kawałek po kawałku i przekazuje zdarzenia dalej
+public class SseDownloadHandler : DownloadHandlerScript
+{
+    private readonly StringBuilder buffer = new StringBuilder();
+    private readonly Action<string, string> onEvent;
+
+    public SseDownloadHandler(Action<string, string> onEvent) : base(new byte[1024])
+    {
+        this.onEvent = onEvent;
+    }
+
+    protected override bool ReceiveData(byte[] data, int dataLength)
+    {
+        if (data == null || dataLength == 0)
+            return false;
+
+        buffer.Append(Encoding.UTF8.GetString(data, 0, dataLength));
+        // Zdarzenia oddzielone są pustą linią
+        string content = buffer.ToString();
+        int end;
+        while ((end = content.IndexOf("\n\n", StringComparison.Ordinal)) >= 0)
+        {
+            ParseEvent(content.Substring(0, end));
+            content = content.Substring(end + 2);
+        }
+        buffer.Clear().Append(content);
+        return true;
+    }
+
+    private void ParseEvent(string block)
+    {
+        string eventName = "message";
+        string data = "";
+        foreach (string line in block.Split('\n'))
+        {
+            if (line.StartsWith("event: "))
+                eventName = line.Substring(7);
+            else if (line.StartsWith("data: "))
+                data = line.Substring(6);
+        }
+        onEvent?.Invoke(eventName, data);
+    }
+}
+
 public class ItemQueryManager : MonoBehaviour
 {
-    private readonly string apiUrl = "http://localhost:5000/generate";
+    private readonly string apiUrl = "http://localhost:5000/async/generate";
+    private readonly string streamUrl = "http://localhost:5000/generate/stream";
+    private readonly string batchUrl = "http://localhost:5000/generate_batch";
+    private readonly Dictionary<string, string> prefetchedAnswers = new Dictionary<string, string>(); // Odpowiedzi pobrane z wyprzedzeniem
+    public int timeoutSeconds = 30;
+    public bool useStreaming = true; // Wyświetlanie odpowiedzi w trakcie generowania
     public System.Action<string> OnAnswerReceived;
+    public System.Action<string> OnPartialAnswer; // Dotychczas otrzymana część odpowiedzi
 
     public void AskQuestion(ItemType itemType, string question)
     {
-        StartCoroutine(SendQuery(itemType, question));
+        if (prefetchedAnswers.TryGetValue(AnswerKey(itemType, question), out string answer))
+        {
+            OnAnswerReceived?.Invoke(answer); // Odpowiedź już pobrana, bez zapytania do serwera
+            return;
+        }
+
+        if (useStreaming)
+            StartCoroutine(SendStreamingQuery(itemType, question));
+        else
+            StartCoroutine(SendQuery(itemType, question));
+    }
+
+    // Pobiera odpowiedzi na wszystkie pytania przedmiotu jednym zapytaniem (np. po otwarciu ekwipunku)
+    public void PrefetchAnswers(ItemType itemType, string[] questions)
+    {
+        StartCoroutine(SendBatchQuery(itemType, questions));
+    }
+
+    private static string AnswerKey(ItemType itemType, string question) => $"{itemType}|{question}";
+
+    private IEnumerator SendBatchQuery(ItemType itemType, string[] questions)
+    {
+        var pending = new List<string>();
+        foreach (string question in questions)
+        {
+            if (!string.IsNullOrEmpty(question) && !prefetchedAnswers.ContainsKey(AnswerKey(itemType, question)))
+                pending.Add(question);
+        }
+        if (pending.Count == 0)
+            yield break;
+
+        var batchData = new BatchQueryRequest { queries = new QueryData[pending.Count] };
+        for (int i = 0; i < pending.Count; i++)
+        {
+            batchData.queries[i] = new QueryData
+            {
+                itemType = itemType.ToString().ToLower(),
+                question = pending[i]
+            };
+        }
+
+        var request = new UnityWebRequest(batchUrl, "POST");
+        request.uploadHandler = new UploadHandlerRaw(Encoding.UTF8.GetBytes(JsonUtility.ToJson(batchData)));
+        request.downloadHandler = new DownloadHandlerBuffer();
+        request.SetRequestHeader("Content-Type", "application/json");
+        request.timeout = timeoutSeconds;
+
+        Debug.Log($"Prefetching {pending.Count} answers about {itemType}");
+        yield return request.SendWebRequest();
+
+        if (request.result == UnityWebRequest.Result.Success)
+        {
+            var response = JsonUtility.FromJson<BatchQueryResponse>(request.downloadHandler.text);
+            for (int i = 0; i < response.results.Length && i < pending.Count; i++)
+            {
+                // Pytania z błędem zostaną zadane zwykłą drogą
+                if (string.IsNullOrEmpty(response.results[i].error))
+                    prefetchedAnswers[AnswerKey(itemType, pending[i])] = response.results[i].response;
+            }
+        }
+        else
+        {
+            Debug.LogWarning($"Prefetch Error: {request.error}");
+        }
+
+        request.Dispose();
     }
 
     private IEnumerator SendQuery(ItemType itemType, string question)
@@ -43,6 +178,7 @@ public class ItemQueryManager : MonoBehaviour
         request.uploadHandler = new UploadHandlerRaw(bodyRaw);
         request.downloadHandler = new DownloadHandlerBuffer();
         request.SetRequestHeader("Content-Type", "application/json");
+        request.timeout = timeoutSeconds; // Nie czekaj w nieskończoność na przeciążony serwer
 
         // Wyślij zapytanie
         Debug.Log($"Sending query about {itemType}: {question}");
@@ -63,6 +199,17 @@ public class ItemQueryManager : MonoBehaviour
                 OnAnswerReceived?.Invoke(response.response);
             }
         }
+        else if (request.responseCode == 503)
+        {
+            // Serwer odrzucił zapytanie, bo kolejka inferencji jest pełna
+            Debug.LogWarning("Server busy, try again later");
+            OnAnswerReceived?.Invoke("The server is busy right now. Please ask again in a moment.");
+        }
+        else if (request.responseCode == 504)
+        {
+            Debug.LogWarning("Server timed out");
+            OnAnswerReceived?.Invoke("The answer took too long. Please try again.");
+        }
         else
         {
             Debug.LogError($"Request Error: {request.error}");
@@ -71,6 +218,67 @@ public class ItemQueryManager : MonoBehaviour
 
         request.Dispose();
     }
+
+    private IEnumerator SendStreamingQuery(ItemType itemType, string question)
+    {
+        var queryData = new QueryData
+        {
+            itemType = itemType.ToString().ToLower(),
+            question = question
+        };
+
+        string jsonData = JsonUtility.ToJson(queryData);
+        var partialAnswer = new StringBuilder();
+        bool finished = false;
+
+        // Zdarzenia przychodzą w wątku głównym (ReceiveData), więc można od razu aktualizować UI
+        var downloadHandler = new SseDownloadHandler((eventName, data) =>
+        {
+            if (eventName == "token")
+            {
+                partialAnswer.Append(JsonUtility.FromJson<StreamToken>(data).text);
+                OnPartialAnswer?.Invoke(partialAnswer.ToString());
+            }
+            else if (eventName == "done")
+            {
+                finished = true;
+                var response = JsonUtility.FromJson<QueryResponse>(data);
+                Debug.Log($"Response: {response.response}");
+                OnAnswerReceived?.Invoke(response.response); // Ostateczna, sformatowana odpowiedź
+            }
+            else if (eventName == "error")
+            {
+                finished = true;
+                Debug.LogError($"API Error: {JsonUtility.FromJson<QueryResponse>(data).error}");
+                OnAnswerReceived?.Invoke("Sorry, there was an error processing your question.");
+            }
+        });
+
+        var request = new UnityWebRequest(streamUrl, "POST");
+        request.uploadHandler = new UploadHandlerRaw(Encoding.UTF8.GetBytes(jsonData));
+        request.downloadHandler = downloadHandler;
+        request.SetRequestHeader("Content-Type", "application/json");
+        request.SetRequestHeader("Accept", "text/event-stream");
+        request.timeout = timeoutSeconds;
+
+        Debug.Log($"Sending streaming query about {itemType}: {question}");
+        yield return request.SendWebRequest();
+
+        if (!finished && request.responseCode == 503)
+        {
+            // Serwer odrzucił strumień, bo limit generowania jest wyczerpany
+            Debug.LogWarning("Server busy, try again later");
+            OnAnswerReceived?.Invoke("The server is busy right now. Please ask again in a moment.");
+        }
+        else if (!finished)
+        {
+            // Błąd przed rozpoczęciem strumienia (np. 404) lub zerwane połączenie
+            Debug.LogError($"Request Error: {request.error}");
+            OnAnswerReceived?.Invoke("Sorry, there was an error connecting to the server.");
+        }
+
+        request.Dispose();
+    }
 }
 
 [System.Serializable]
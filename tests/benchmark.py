@@ -0,0 +1,242 @@
+"""
+Test obciążeniowy serwera: zadaje pytania z zestawów testowych z zadaną współbieżnością
+i mierzy opóźnienia (p50/p95/p99), przepustowość, odsetek błędów oraz pamięć serwera (RSS).
+Wyniki zapisywane są w JSON, aby można było porównywać uruchomienia dla różnych modeli i ustawień.
+Pytań testowych jest niewiele, więc do pomiaru samego modelu serwer należy uruchomić
+z ANSWER_CACHE_SIZE=0 (inaczej powtórzone pytania obsługuje pamięć odpowiedzi).
+Z --in-process pamięć odpowiedzi jest domyślnie wyłączona.
+
+Przykłady:
+    # Serwer uruchomiony osobno (dowolny z server_model_*.py, server.py lub serve.py)
+    python tests/benchmark.py --url http://localhost:5000 --concurrency 1,4,8 --requests 60
+
+    # Bez serwera: aplikacja w tym samym procesie (Flask test client)
+    python tests/benchmark.py --in-process --backends text2text-v2 --mix text2text-v2:fast=1,text2text-v2:quality=1
+
+    # Porównanie zapisanych wyników
+    python tests/benchmark.py --compare results/base.json results/int8.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from question_sets import QUESTIONS  # noqa: E402
+
+AI_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model")
+SETTINGS = (
+    "QUANTIZE", "ENCODER_CACHE_MODE", "MAX_BATCH_SIZE", "MAX_BATCH_WAIT_MS", "ANSWER_CACHE_SIZE",
+    "DECODING", "GENERATION_MODE", "RETRIEVAL_TOP_K", "QA_CONTEXT_MODE", "INFERENCE_WORKERS", "REPLICAS", "REPLICA_THREADS",
+    "REFINE_MODEL", "HYBRID_QA_MODEL", "HYBRID_MIN_SCORE"
+)  # Zmienne środowiskowe zapisywane razem z wynikami
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    low, high = int(k), min(int(k) + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def process_rss_mb(pid="self"):
+    """RSS procesu w MB (Linux: /proc/<pid>/status) lub None."""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def parse_mix(mix):
+    """
+    "text2text-v2:fast=3,qa=1" -> [(model, mode, waga), ...]; pusta wartość = domyślny model serwera.
+    """
+    entries = []
+    for part in filter(None, mix.split(",")):
+        name, _, weight = part.partition("=")
+        model, _, mode = name.partition(":")
+        entries.append((model or None, mode or None, float(weight or 1)))
+    return entries or [(None, None, 1.0)]
+
+
+class HttpClient:
+    def __init__(self, base_url, path):
+        import requests
+        self.session = requests.Session()
+        self.url = base_url.rstrip("/") + path
+
+    def post(self, payload):
+        response = self.session.post(self.url, json=payload, timeout=300)
+        return response.status_code
+
+
+class InProcessClient:
+    """Aplikacja Flask w tym samym procesie - działa bez sieci i bez uruchomionego serwera."""
+
+    def __init__(self, backends, path):
+        sys.path.insert(0, AI_MODEL_DIR)
+        from server import create_app
+        self.app = create_app(backends, eager=backends)
+        self.path = path
+
+    def post(self, payload):
+        return self.app.test_client().post(self.path, json=payload).status_code
+
+
+def build_requests(mix, count, seed):
+    rng = random.Random(seed)
+    questions = [(item, question) for item, qs in QUESTIONS.items() for question in qs]
+    weights = [weight for _, _, weight in mix]
+    payloads = []
+    for _ in range(count):
+        model, mode, _ = rng.choices(mix, weights)[0]
+        item_type, question = rng.choice(questions)
+        payload = {"itemType": item_type, "question": question}
+        if model:
+            payload["model"] = model
+        if mode:
+            payload["mode"] = mode
+        payloads.append(payload)
+    return payloads
+
+
+def run_level(client, payloads, concurrency, server_pid):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    peak_rss = [process_rss_mb(server_pid)]
+
+    def send(payload):
+        start_time = time.perf_counter()
+        try:
+            status = client.post(payload)
+        except Exception:
+            status = "exception"  # Np. przekroczony czas lub zerwane połączenie
+        latency = time.perf_counter() - start_time
+        rss = process_rss_mb(server_pid)
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(latency)
+            if rss is not None and (peak_rss[0] is None or rss > peak_rss[0]):
+                peak_rss[0] = rss
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, payloads))
+    duration = time.perf_counter() - start_time
+
+    errors = len(payloads) - statuses.get("200", 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "duration": duration,
+        "throughput": statuses.get("200", 0) / duration,
+        "errorRate": errors / len(payloads),
+        "statuses": statuses,
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None
+        },
+        "peakRssMb": peak_rss[0]
+    }
+
+
+def print_levels(levels, title=""):
+    def fmt(value):
+        return f"{value:8.3f}" if value is not None else "       -"
+
+    if title:
+        print(f"\n{title}")
+    print("conc  req    thr[req/s]  err     p50[s]   p95[s]   p99[s]   rss[MB]")
+    for r in levels:
+        latency = r["latency"]
+        rss = f"{r['peakRssMb']:.0f}" if r["peakRssMb"] is not None else "-"
+        print(f"{r['concurrency']:<5} {r['requests']:<6} {r['throughput']:<11.2f} {r['errorRate']:<7.1%} "
+              f"{fmt(latency['p50'])} {fmt(latency['p95'])} {fmt(latency['p99'])} {rss}")
+
+
+def compare(paths):
+    for path in paths:
+        with open(path) as file:
+            run = json.load(file)
+        print_levels(run["levels"], f"{path} ({run['config']['target']}, mix {run['config']['mix']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test and latency benchmark for the item question servers")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:5000", help="Base URL of a running server")
+    target.add_argument("--in-process", action="store_true", help="Run the app in this process (Flask test client)")
+    parser.add_argument("--backends", default="text2text-v2", help="Backends to load with --in-process")
+    parser.add_argument("--path", default="/generate", help="Endpoint, e.g. /generate or /async/generate")
+    parser.add_argument("--mix", default="", help="Weighted request mix, e.g. text2text-v2:fast=3,qa=1")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=60, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests before the first level")
+    parser.add_argument("--server-pid", help="PID of a local server process for RSS (default: this process with --in-process)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS", help="Print saved result files side by side and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    if args.in_process:
+        os.environ.setdefault("ANSWER_CACHE_SIZE", "0")  # Każde pytanie trafia do modelu
+        backends = [name for name in args.backends.split(",") if name]
+        client = InProcessClient(backends, args.path)
+        server_pid = "self"
+    else:
+        client = HttpClient(args.url, args.path)
+        server_pid = args.server_pid
+
+    for payload in build_requests(mix, args.warmup, args.seed + 1):
+        client.post(payload)  # Rozgrzewka (leniwe ładowanie modeli, pierwsze alokacje)
+
+    levels = []
+    for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+        payloads = build_requests(mix, args.requests, args.seed)
+        levels.append(run_level(client, payloads, concurrency, server_pid))
+        print_levels(levels[-1:], f"concurrency {concurrency}")
+
+    results = {
+        "config": {
+            "target": "in-process" if args.in_process else args.url,
+            "backends": args.backends if args.in_process else None,
+            "path": args.path,
+            "mix": args.mix or "default",
+            "requests": args.requests,
+            "seed": args.seed,
+            "settings": {name: os.environ[name] for name in SETTINGS if name in os.environ},
+            "host": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "levels": levels
+    }
+    print_levels(levels, "summary")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
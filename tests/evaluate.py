@@ -0,0 +1,158 @@
+"""
+Ocena dokładności backendów na zbiorze wzorcowych odpowiedzi (tests/gold_answers.json).
+Dla każdego backendu (i trybu generowania) liczy dokładną zgodność (EM), F1 na słowach,
+odsetek odpowiedzi zawierających wzorzec oraz opóźnienie. Modele działają w tym samym
+procesie (Flask test client), pytania zadawane są przez /generate_batch.
+
+Przykład:
+    python tests/evaluate.py --backends qa,summarization,text2text-v1,text2text-v2:fast,text2text-v2:quality,text2text-v2:hybrid,text2text-v3:quality
+"""
+import argparse
+import json
+import os
+import re
+import string
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault("DECODING", "greedy")  # Powtarzalne wyniki (bez próbkowania)
+os.environ.setdefault("ANSWER_CACHE_SIZE", "0")  # Każde pytanie trafia do modelu
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLD_PATH = os.path.join(TESTS_DIR, "gold_answers.json")
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "AI model"))
+
+
+def normalize_answer(text):
+    # Jak w SQuAD: małe litery, bez interpunkcji, przedimków i nadmiarowych spacji
+    text = "".join(ch for ch in text.lower() if ch not in set(string.punctuation) | {"’", "‘"})
+    text = re.sub(r"\b(a|an|the)\b", " ", text)
+    return " ".join(text.split())
+
+
+def exact_match(prediction, reference):
+    return float(normalize_answer(prediction) == normalize_answer(reference))
+
+
+def token_f1(prediction, reference):
+    pred_tokens = normalize_answer(prediction).split()
+    ref_tokens = normalize_answer(reference).split()
+    if not pred_tokens or not ref_tokens:
+        return float(pred_tokens == ref_tokens)
+    common = sum((Counter(pred_tokens) & Counter(ref_tokens)).values())
+    if common == 0:
+        return 0.0
+    precision = common / len(pred_tokens)
+    recall = common / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def contains_answer(prediction, reference):
+    # Odpowiedzi w pełnym zdaniu (v2/v3) rzadko są dokładnie równe wzorcowi, ale powinny go zawierać
+    return float(f" {normalize_answer(reference)} " in f" {normalize_answer(prediction)} ")
+
+
+def score(prediction, references):
+    return {
+        "exactMatch": max(exact_match(prediction, ref) for ref in references),
+        "f1": max(token_f1(prediction, ref) for ref in references),
+        "contains": max(contains_answer(prediction, ref) for ref in references)
+    }
+
+
+def load_gold(path=GOLD_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def evaluate(client, backend_name, mode, gold, sequential=True, decoding=None):
+    """Ocena jednego backendu (i trybu oraz profilu dekodowania) na całym zbiorze wzorcowym."""
+    options = {"model": backend_name}
+    if mode:
+        options["mode"] = mode
+    if decoding:
+        options["decoding"] = decoding
+    payload = {"queries": [{"itemType": e["itemType"], "question": e["question"]} for e in gold], **options}
+
+    start_time = time.perf_counter()
+    results = client.post("/generate_batch", json=payload).get_json()["results"]
+    batch_time = time.perf_counter() - start_time
+
+    backend = client.application.extensions["backends"][backend_name]
+    if backend.answer_cache is not None:
+        backend.answer_cache.clear()  # Pomiar opóźnienia modelu, nie pamięci odpowiedzi
+
+    latencies = []
+    if sequential:
+        # Opóźnienie pojedynczego zapytania (bez współdzielenia batcha z innymi pytaniami)
+        for e in gold:
+            request = {"itemType": e["itemType"], "question": e["question"], **options}
+            start_time = time.perf_counter()
+            client.post("/generate", json=request)
+            latencies.append(time.perf_counter() - start_time)
+
+    rows = []
+    for e, result in zip(gold, results):
+        prediction = result.get("response", "") if "error" not in result else ""
+        rows.append({"itemType": e["itemType"], "question": e["question"], "prediction": prediction,
+                     "answers": e["answers"], **score(prediction, e["answers"])})
+
+    count = len(rows)
+    latencies.sort()
+    return {
+        "backend": backend_name,
+        "mode": mode,
+        "decoding": decoding,
+        "questions": count,
+        "errors": sum(1 for result in results if "error" in result),
+        "exactMatch": sum(r["exactMatch"] for r in rows) / count,
+        "f1": sum(r["f1"] for r in rows) / count,
+        "contains": sum(r["contains"] for r in rows) / count,
+        "batchSecondsPerQuestion": batch_time / count,
+        "latencyMean": sum(latencies) / len(latencies) if latencies else None,
+        "latencyP95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+        "answers": rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline accuracy and latency evaluation against gold answers")
+    parser.add_argument("--backends", default="qa,summarization,text2text-v1,text2text-v2:fast,text2text-v2:quality",
+                        help="Comma-separated backend[:mode] entries")
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--decoding", help="Decoding profile for FLAN-T5 backends (greedy, beam, sampling)")
+    parser.add_argument("--no-sequential", action="store_true", help="Skip the one-request-at-a-time latency pass")
+    parser.add_argument("--verbose", action="store_true", help="Print every prediction")
+    parser.add_argument("--output", help="JSON file for the full report")
+    args = parser.parse_args()
+
+    from server import create_app
+
+    gold = load_gold(args.gold)
+    entries = [entry.partition(":")[::2] for entry in args.backends.split(",") if entry]
+    names = list(dict.fromkeys(name for name, _ in entries))
+    client = create_app(names).test_client()  # Modele ładowane leniwie, przy pierwszym pytaniu
+
+    reports = []
+    for name, mode in entries:
+        client.post("/generate", json={"itemType": gold[0]["itemType"], "question": gold[0]["question"], "model": name})  # Załadowanie modelu
+        report = evaluate(client, name, mode or None, gold, sequential=not args.no_sequential, decoding=args.decoding)
+        reports.append(report)
+        if args.verbose:
+            for row in report["answers"]:
+                print(f"[{name}{':' + mode if mode else ''}] {row['question']}\n  -> {row['prediction']}  (gold: {row['answers'][0]})")
+
+    print("\nBackend                  EM     F1     contains  batch[s/q]  latency[s]  p95[s]")
+    for r in reports:
+        label = r["backend"] + (f":{r['mode']}" if r["mode"] else "")
+        latency = f"{r['latencyMean']:<11.3f} {r['latencyP95']:.3f}" if r["latencyMean"] is not None else "-"
+        print(f"{label:<24} {r['exactMatch']:.2f}   {r['f1']:.2f}   {r['contains']:.2f}      {r['batchSecondsPerQuestion']:<11.3f} {latency}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(reports, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
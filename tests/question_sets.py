@@ -0,0 +1,28 @@
+# Zestawy pytań testowych dla przedmiotów z katalogu "AI model/items"
+QUESTIONS = {
+    "diamondpickaxe": [
+        "Who crafted the Diamond Pickaxe?",
+        "What materials can the Diamond Pickaxe mine?",
+        "In which dimension was the Diamond Pickaxe lost?"
+    ],
+    "lumberjackburger": [
+        "When was this burger first introduced and by which restaurant?",
+        "How many units of Lumberjack Burger were sold in the first week?",
+        "In which year did the Lumberjack Burger make its triumphant return?"
+    ],
+    "whiskyglass": [
+        "What is the glass made of?",
+        "How many brawls has the glass survived?",
+        "What is always inside Julian's glass?"
+    ],
+    "veganfur": [
+        "What was the original material used in the prototype of the vegan fur coat?",
+        "What is the material of the vegan fur coat made of?",
+        "Where can this coat be found for sale?"
+    ],
+    "studyguide": [
+        "Who wrote this study guide book?",
+        "How many pages does this book have?",
+        "By how much does the book reduce exam stress?"
+    ]
+}
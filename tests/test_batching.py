@@ -0,0 +1,49 @@
+"""
+Testy kolejki batchującej (bez modeli): przekroczenie czasu jednego zapytania
+nie może zatrzymać pozostałych zapytań z tego samego batcha ani kolejnych batchy.
+
+Przykład:
+    python -m pytest tests/test_batching.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model"))
+
+from batching import MicroBatcher  # noqa: E402
+from process_pool import ReplicaError, task_result  # noqa: E402
+
+
+def slow_upper(items):
+    time.sleep(0.5)  # Batch przetwarzany dłużej niż limit czasu pierwszego zapytania
+    return [item.upper() for item in items]
+
+
+def test_timeout_does_not_break_batch():
+    batcher = MicroBatcher(slow_upper, max_batch_size=4, max_wait_ms=50)
+    first, second = batcher.submit("a"), batcher.submit("b")
+    try:
+        task_result(first, timeout=0.1)
+        raise AssertionError("expected a timeout")
+    except ReplicaError:
+        pass
+    assert task_result(second, timeout=2) == "B"  # Sąsiad z tego samego batcha dostaje wynik
+    assert task_result(batcher.submit("c"), timeout=2) == "C"  # Kolejka działa dalej
+
+
+def test_cancelled_future_is_skipped():
+    batcher = MicroBatcher(slow_upper, max_batch_size=4, max_wait_ms=50)
+    busy = batcher.submit("a")
+    time.sleep(0.1)  # Pierwszy batch jest w trakcie przetwarzania
+    cancelled, waiting = batcher.submit("b"), batcher.submit("c")
+    assert cancelled.cancel()
+    assert task_result(busy, timeout=2) == "A"
+    assert task_result(waiting, timeout=2) == "C"
+    assert task_result(batcher.submit("d"), timeout=2) == "D"
+
+
+if __name__ == "__main__":
+    test_timeout_does_not_break_batch()
+    test_cancelled_future_is_skipped()
+    print("OK")
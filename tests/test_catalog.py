@@ -0,0 +1,31 @@
+"""
+Testy katalogu przedmiotów (bez modeli): items/*.txt są źródłem opisów, a items/catalog.jsonl
+musi zawierać ich aktualną treść (po zmianie pliku .txt należy uruchomić build_catalog.py).
+
+Przykład:
+    python -m pytest tests/test_catalog.py
+"""
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model"))
+
+from catalog import ITEMS_DIR, ItemCatalog, normalize_item_id  # noqa: E402
+
+
+def test_catalog_matches_item_files():
+    catalog = ItemCatalog(os.path.join(ITEMS_DIR, "catalog.jsonl"))
+    catalog.load()
+    for path in sorted(glob.glob(os.path.join(ITEMS_DIR, "*.txt"))):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        entry = catalog.get(normalize_item_id(stem))
+        assert entry is not None, f"{stem}.txt missing from catalog.jsonl"
+        with open(path, "r", encoding="utf-8") as file:
+            assert entry.text == file.read(), f"{stem}.txt changed, run build_catalog.py"
+        assert stem.replace("_", " ") in entry.aliases
+
+
+if __name__ == "__main__":
+    test_catalog_matches_item_files()
+    print("OK")
@@ -0,0 +1,25 @@
+"""
+Testy formatowania odpowiedzi (bez ładowania modeli).
+
+Przykład:
+    python -m pytest tests/test_formatting.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model"))
+
+from backends import format_span  # noqa: E402
+
+
+def test_span_keeps_proper_nouns():
+    # Fragment z modelu qa trafia do dopracowania i odpowiedzi bez zmiany wielkości liter
+    assert format_span("McDonald's") == "McDonald's."
+    assert format_span("Dr. Max Chill") == "Dr. Max Chill."
+    assert format_span(" steve (Minecraft) ") == "Steve (Minecraft)."
+    assert format_span("The End.") == "The End."
+
+
+if __name__ == "__main__":
+    test_span_keeps_proper_nouns()
+    print("OK")
@@ -0,0 +1,40 @@
+"""
+Testy logowania (bez modeli): ślad stosu rekordu przechodzącego przez kolejkę trafia
+do osobnego pola "exception", a nie do treści komunikatu.
+
+Przykład:
+    python -m pytest tests/test_logging.py
+"""
+import json
+import logging
+import os
+import queue
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model"))
+
+from logging_config import JsonFormatter, RequestIdFilter, StructuredQueueHandler  # noqa: E402
+
+
+def test_exception_survives_queue():
+    log_queue = queue.SimpleQueue()
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    logger = logging.getLogger("nai.test_logging")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("Server error %s", "x")
+    finally:
+        logger.removeHandler(handler)
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "Server error x"
+    assert "ZeroDivisionError" in entry["exception"]
+
+
+if __name__ == "__main__":
+    test_exception_survives_queue()
+    print("OK")
@@ -0,0 +1,80 @@
+"""
+Porównanie odpowiedzi modeli w pełnej precyzji (fp32) i po kwantyzacji (int8/bf16)
+na zestawach pytań testowych. Modele uruchamiane są w tym samym procesie (bez serwera).
+
+Przykład:
+    python tests/test_quantization.py --mode int8 --backends text2text-v3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("DECODING", "greedy")  # Porównywalne odpowiedzi (bez próbkowania)
+os.environ.setdefault("ANSWER_CACHE_SIZE", "0")  # Każde pytanie trafia do modelu
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI model"))
+
+from backends import BACKENDS  # noqa: E402
+from evaluate import token_f1  # noqa: E402
+from question_sets import QUESTIONS  # noqa: E402
+from server import create_app  # noqa: E402
+
+
+def collect_answers(backend_name, quantize):
+    app = create_app([backend_name], eager=[backend_name], quantize=quantize)
+    client = app.test_client()
+    answers, latencies = {}, []
+    for item_type, questions in QUESTIONS.items():
+        for question in questions:
+            start_time = time.time()
+            response = client.post("/generate", json={"itemType": item_type, "question": question})
+            latencies.append(time.time() - start_time)
+            answers[(item_type, question)] = response.get_json().get("response", "")
+    quantization = app.extensions["backends"][backend_name].quantization
+    return answers, sum(latencies) / len(latencies), quantization
+
+
+def compare(backend_name, mode):
+    reference, reference_latency, _ = collect_answers(backend_name, "none")
+    quantized, quantized_latency, used_mode = collect_answers(backend_name, mode)
+
+    exact = [reference[key].strip().lower() == quantized[key].strip().lower() for key in reference]
+    f1 = [token_f1(quantized[key], reference[key]) for key in reference]
+    for key in reference:
+        if reference[key] != quantized[key]:
+            print(f"[{backend_name}] {key[0]}: {key[1]}\n  fp32: {reference[key]}\n  {used_mode}: {quantized[key]}")
+
+    return {
+        "backend": backend_name,
+        "mode": used_mode,
+        "questions": len(reference),
+        "exactMatch": sum(exact) / len(exact),
+        "tokenF1": sum(f1) / len(f1),
+        "latencyFp32": reference_latency,
+        "latencyQuantized": quantized_latency,
+        "speedup": reference_latency / quantized_latency if quantized_latency else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized and fp32 answers on the test question sets")
+    parser.add_argument("--mode", default="int8", choices=["int8", "bf16"])
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backend names")
+    parser.add_argument("--output", help="Optional JSON file for the summary")
+    args = parser.parse_args()
+
+    results = [compare(name, args.mode) for name in args.backends.split(",") if name]
+    print("\nBackend          Mode  EM     F1     fp32 [s]  quant [s]  speedup")
+    for r in results:
+        print(f"{r['backend']:<16} {r['mode']:<5} {r['exactMatch']:.2f}   {r['tokenF1']:.2f}   "
+              f"{r['latencyFp32']:<9.2f} {r['latencyQuantized']:<10.2f} {r['speedup']:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
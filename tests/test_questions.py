@@ -2,6 +2,7 @@ import requests
 
 # Adres URL serwera
 url = "http://localhost:5000/generate"
+batch_url = "http://localhost:5000/generate_batch"
 
 # Pytania do przetestowania
 questions = {
@@ -32,14 +33,17 @@ questions = {
     ]
 }
 
-# Funkcja do zadawania pytań
+# Funkcja do zadawania pytań (wszystkie pytania o przedmiot w jednym zapytaniu)
 def ask_questions(item_type, questions):
-    for question in questions:
-        response = requests.post(url, json={"itemType": item_type, "question": question})
-        if response.status_code == 200:
-            print(f"Question: {question}\nAnswer: {response.json().get('response')}\n")
+    response = requests.post(batch_url, json={"queries": [{"itemType": item_type, "question": q} for q in questions]})
+    if response.status_code != 200:
+        print(f"Error: {response.json().get('error')}")
+        return
+    for question, result in zip(questions, response.json()["results"]):
+        if "error" not in result:
+            print(f"Question: {question}\nAnswer: {result.get('response')}\n")
         else:
-            print(f"Error: {response.json().get('error')}")
+            print(f"Error: {result.get('error')}")
 
 # Przeprowadź testy dla każdego przedmiotu
 for item, qs in questions.items():
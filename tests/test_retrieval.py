@@ -0,0 +1,49 @@
+"""
+Testy wyszukiwania fragmentów opisu (bez modeli): dla pytań z gold_answers.json
+do promptu musi trafić fragment zawierający odpowiedź, także przy RETRIEVAL_TOP_K=2.
+
+Przykład:
+    python -m pytest tests/test_retrieval.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "AI model"))
+
+from catalog import ItemCatalog  # noqa: E402
+from retrieval import RetrievalIndex, tokenize  # noqa: E402
+
+TOP_K = 2
+
+
+def answering_passages(passages, answer):
+    # Fragmenty (bez nagłówka) o największej liczbie wspólnych słów z odpowiedzią wzorcową
+    words = set(tokenize(answer))
+    overlaps = [len(words & set(tokenize(passage))) for passage in passages[1:]]
+    best = max(overlaps)
+    return {passage for passage, overlap in zip(passages[1:], overlaps) if overlap == best} if best else set()
+
+
+def test_gold_questions_retrieve_answering_passage():
+    catalog = ItemCatalog()
+    catalog.load()
+    with open(os.path.join(TESTS_DIR, "gold_answers.json"), "r", encoding="utf-8") as file:
+        gold = json.load(file)
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = RetrievalIndex(top_k=TOP_K, index_dir=index_dir)
+        index.rebuild(catalog.texts())
+        for case in gold:
+            item_id = catalog.resolve(case["itemType"])
+            expected = answering_passages(index._indexes[item_id].passages, case["answers"][0])
+            if not expected:
+                continue  # Odpowiedź spoza opisu (np. "I don't know.")
+            selected = set(index.retrieve(item_id, case["question"]).splitlines()[1:])
+            assert selected & expected, (case["question"], selected)
+
+
+if __name__ == "__main__":
+    test_gold_questions_retrieve_answering_passage()
+    print("OK")